@@ -5,49 +5,157 @@ Endpoint principali:
 - GET  /health
 - GET  /jobs               (paginazione/ordinamento, filtro per mode)
 - POST /jobs/{job_id}/flags  (aggiorna viewed/interested/applied/notes)
+- POST /jobs/flags:bulk      (più aggiornamenti in un'unica transazione)
 
 Configurazione DB:
 - Env var LISTSCRAPER_DB (default: percorso relativo storage/jobs.db)
+- Env var LISTSCRAPER_DB_POOL_SIZE: connessioni aiosqlite per worker (default: 4)
 
-Esecuzione:
-  uvicorn api.server:app --host 127.0.0.1 --port 8000
+Esecuzione (richiede uvicorn[standard] per uvloop + httptools):
+  uvicorn api.server:app --host 127.0.0.1 --port 8000 --loop uvloop --http httptools --no-access-log
+
+oppure, equivalente:
+  python -m api.server
 """
 
 from __future__ import annotations
 
+import gzip
+import hashlib
+import logging
+import math
 import os
-from typing import Any, Optional
+from typing import Any, AsyncIterator, List, Literal, Optional
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import HTMLResponse
+import aiosqlite
+import orjson
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
-from storage.sqlite_db import query_jobs, set_job_flags
+from storage.sqlite_db import (
+    ORDERABLE_COLUMNS,
+    AsyncConnectionPool,
+    count_jobs_async,
+    decode_cursor,
+    encode_cursor,
+    ensure_mode_indexes_async,
+    get_db_path,
+    iter_jobs_async,
+    set_job_flags_async,
+    set_job_flags_bulk_async,
+)
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
 
+# Valori ammessi per l'ordinamento: insieme chiuso di testi SQL (niente colonne arbitrarie)
+_ALLOWED_ORDER = frozenset(ORDERABLE_COLUMNS)
+_ALLOWED_DIR = frozenset({"ASC", "DESC"})
 
-# Percorso relativo alla root del progetto
-DEFAULT_DB = os.path.join(os.path.dirname(os.path.dirname(__file__)), "storage", "jobs.db")
+# Filtri di stato accettati da /jobs (validati da FastAPI prima di arrivare al DB)
+JobMode = Literal["not_viewed", "viewed", "interested", "applied"]
 
 
-def get_db_path() -> str:
-    return os.getenv("LISTSCRAPER_DB", DEFAULT_DB)
+app = FastAPI(title="ListScraper API", version="1.0.0", default_response_class=ORJSONResponse)
+# Le risposte /jobs (motivazioni LLM, titoli, URL) e l'HTML sono testo molto comprimibile
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=5)
+
+
+@app.on_event("startup")
+async def open_db() -> None:
+    """Apre il pool di connessioni aiosqlite usato da tutte le richieste del worker."""
+    # Percorso risolto una sola volta per worker (env LISTSCRAPER_DB letta all'avvio)
+    app.state.db_path = get_db_path()
+    pool = AsyncConnectionPool(app.state.db_path, size=int(os.getenv("LISTSCRAPER_DB_POOL_SIZE", "4")))
+    await pool.open()
+    app.state.db_pool = pool
+    # DB creati prima degli indici parziali per mode: aggiungili una volta all'avvio
+    conn = await pool.acquire()
+    try:
+        await ensure_mode_indexes_async(conn)
+    finally:
+        pool.release(conn)
 
 
-app = FastAPI(title="ListScraper API", version="1.0.0")
+@app.on_event("shutdown")
+async def close_db() -> None:
+    pool = getattr(app.state, "db_pool", None)
+    if pool is not None:
+        await pool.close()
+
+
+async def _release_conn(pool: AsyncConnectionPool, conn: aiosqlite.Connection) -> None:
+    # Non restituire al pool una connessione con una transazione lasciata aperta
+    if conn.in_transaction:
+        await conn.rollback()
+    pool.release(conn)
+
+
+async def db_conn(request: Request) -> AsyncIterator[aiosqlite.Connection]:
+    """Dependency: presta una connessione del pool per la durata della richiesta."""
+    pool = request.app.state.db_pool
+    conn = await pool.acquire()
+    try:
+        yield conn
+    finally:
+        await _release_conn(pool, conn)
+
+
+# Risposta costante per le probe di liveness: nessuna serializzazione per richiesta
+_HEALTH = Response(content=b'{"status":"ok"}', media_type="application/json")
 
 
 @app.get("/health")
-def health() -> dict[str, Any]:
-    return {"status": "ok"}
+def health() -> Response:
+    return _HEALTH
+
+
+async def _stream_jobs(
+    pool: AsyncConnectionPool,
+    conn: aiosqlite.Connection,
+    first_batch: Optional[list[dict[str, Any]]],
+    batches: AsyncIterator[list[dict[str, Any]]],
+    meta: dict[str, Any],
+    page_size: int,
+    order_by: str,
+) -> AsyncIterator[bytes]:
+    """Serializza la pagina in modo incrementale: {"rows":[...], total_rows, ..., next_cursor}.
+
+    La connessione è di proprietà del generatore (le dependency con yield vengono chiuse
+    prima dell'invio del body) e torna al pool a fine stream o alla disconnessione del client.
+    """
+    try:
+        prefix = b'{"rows":['
+        count = 0
+        last = None
+        batch = first_batch
+        while batch:
+            chunk = b",".join(orjson.dumps(row) for row in batch)
+            yield prefix + (b"," if count else b"") + chunk
+            prefix = b""
+            count += len(batch)
+            last = batch[-1]
+            batch = await anext(batches, None)
+        meta["next_cursor"] = encode_cursor(last, order_by) if count == page_size else None
+        # Chiude l'array e accoda i metadati riusando l'oggetto serializzato senza la '{' iniziale
+        yield prefix + b"]," + orjson.dumps(meta)[1:]
+    finally:
+        await batches.aclose()
+        await _release_conn(pool, conn)
 
 
 @app.get("/jobs")
-def list_jobs(
+async def list_jobs(
+    request: Request,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=500),
     order_by: str = Query("llm_score"),
     order_dir: str = Query("DESC"),
-    mode: str = Query("not_viewed"),
+    mode: JobMode = Query("not_viewed"),
+    cursor: Optional[str] = Query(None),
 ):
     """
     Elenca i job con paginazione e filtri.
@@ -58,20 +166,52 @@ def list_jobs(
             - "viewed": solo viewed=true
             - "interested": interested=true
             - "applied": applied=true
+        cursor: `next_cursor` della pagina precedente (paginazione keyset, senza OFFSET);
+            `page` resta usato per la pagina iniziale e per l'indicazione in risposta
+
+    Le righe sono inviate in streaming (JSON incrementale) per non materializzare la pagina.
     """
+    if order_by not in _ALLOWED_ORDER:
+        raise HTTPException(status_code=422, detail=f"order_by non valido: {order_by}")
+    order_dir = order_dir.upper()
+    if order_dir not in _ALLOWED_DIR:
+        raise HTTPException(status_code=422, detail=f"order_dir non valido: {order_dir}")
+
+    pool = request.app.state.db_pool
+    conn = await pool.acquire()
     try:
-        rows, total_rows, total_pages = query_jobs(
-            db_path=get_db_path(),
+        if cursor is not None:
+            decode_cursor(cursor)  # cursor malformato -> 400 prima di iniziare lo stream
+        # COUNT ricalcolato a pagina 1, poi riusato (TTL breve) sfogliando le pagine successive
+        total_rows = await count_jobs_async(conn, mode, refresh=(page == 1))
+        batches = iter_jobs_async(
+            conn,
             page=page,
             page_size=page_size,
             order_by=order_by,
             order_dir=order_dir,
             mode=mode,
+            cursor=cursor,
         )
-        return {"rows": rows, "total_rows": total_rows, "total_pages": total_pages, "page": page}
+        # Il primo blocco è letto qui: errori SQL diventano ancora una risposta 4xx/5xx
+        first_batch = await anext(batches, None)
+    except ValueError as e:
+        await _release_conn(pool, conn)
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        await _release_conn(pool, conn)
         raise HTTPException(status_code=500, detail=str(e))
 
+    meta = {
+        "total_rows": total_rows,
+        "total_pages": max(1, math.ceil(total_rows / page_size)),
+        "page": page,
+    }
+    return StreamingResponse(
+        _stream_jobs(pool, conn, first_batch, batches, meta, page_size, order_by),
+        media_type="application/json",
+    )
+
 
 class FlagsIn(BaseModel):
     viewed: Optional[bool] = Field(default=None)
@@ -81,11 +221,11 @@ class FlagsIn(BaseModel):
 
 
 @app.post("/jobs/{job_id}/flags")
-def update_flags(job_id: str, body: FlagsIn):
+async def update_flags(job_id: str, body: FlagsIn, db: aiosqlite.Connection = Depends(db_conn)):
     """Aggiorna le flag utente per un job specifico."""
     try:
-        set_job_flags(
-            db_path=get_db_path(),
+        await set_job_flags_async(
+            db,
             job_id=job_id,
             viewed=body.viewed,
             interested=body.interested,
@@ -94,311 +234,65 @@ def update_flags(job_id: str, body: FlagsIn):
         )
         return {"status": "ok", "job_id": job_id}  # Conferma con job_id
     except Exception as e:
-        import traceback
-        traceback.print_exc()  # Log completo dell'errore
+        # Traceback formattato solo se un handler di logging lo emette davvero
+        logger.exception("set_job_flags failed for %s", job_id)
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+class FlagsUpdateIn(FlagsIn):
+    job_id: str
+
+
+class BulkFlagsIn(BaseModel):
+    updates: List[FlagsUpdateIn] = Field(default_factory=list)
+
+
+@app.post("/jobs/flags:bulk")
+async def update_flags_bulk(body: BulkFlagsIn, db: aiosqlite.Connection = Depends(db_conn)):
+    """Aggiorna le flag di più job in un'unica transazione (usato per le note con debounce)."""
+    try:
+        updated = await set_job_flags_bulk_async(
+            db,
+            [u.model_dump() for u in body.updates],
+        )
+        return {"status": "ok", "updated": updated}
+    except Exception as e:
+        logger.exception("set_job_flags_bulk failed for %d updates", len(body.updates))
         raise HTTPException(status_code=400, detail=str(e))
 
 
+# Dashboard statica (api/static/index.html): letta, hashata e compressa una sola volta all'import
+_STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+with open(os.path.join(_STATIC_DIR, "index.html"), "rb") as f:
+    _INDEX_BYTES = f.read()
+_INDEX_GZIP = gzip.compress(_INDEX_BYTES, compresslevel=9, mtime=0)
+_INDEX_ETAG = f'"{hashlib.md5(_INDEX_BYTES).hexdigest()}"'
+_INDEX_HEADERS = {"ETag": _INDEX_ETAG, "Cache-Control": "public, max-age=300", "Vary": "Accept-Encoding"}
+
 
 @app.get("/", response_class=HTMLResponse)
-def index() -> str:
-    return '''<!doctype html>
-<html>
-  <head>
-    <meta charset="utf-8" />
-    <meta name="viewport" content="width=device-width, initial-scale=1" />
-    <title>ListScraper</title>
-    <link rel="icon" href="data:image/svg+xml,<svg xmlns=%22http://www.w3.org/2000/svg%22 viewBox=%220 0 100 100%22><text y=%22.9em%22 font-size=%2290%22>💼</text></svg>">
-    <style>
-      body { 
-        font-family: system-ui, -apple-system, Segoe UI, Roboto, sans-serif; 
-        margin: 24px; 
-        background-color: #2b2b2b;
-        color: #e0e0e0;
-      }
-      header { display:flex; gap:30px; align-items:center; flex-wrap:wrap; margin-bottom: 16px; }
-      input, select, button { 
-        padding:8px; 
-        background-color: #3a3a3a;
-        color: #e0e0e0;
-        border: 1px solid #555;
-        border-radius: 4px;
-      }
-      button:hover { background-color: #4a4a4a; cursor: pointer; }
-      table { width:100%; border-collapse: collapse; background-color: #333; }
-      th, td { text-align:left; padding:8px; border-bottom:1px solid #444; }
-      th { cursor:pointer; background-color: #3a3a3a; }
-      tr:hover { background-color: #3a3a3a; }
-      a { color: #5ca9ff; }
-      a:visited { color: #9d7cff; }
-      .meta { color:#999; font-size:12px; }
-      input[type="text"] { background-color: #3a3a3a; color: #e0e0e0; }
-            /* Animazione fade-out per rimozione riga */
-      @keyframes fadeOutRow {
-        from {
-          opacity: 1;
-          transform: translateX(0);
-        }
-        to {
-          opacity: 0;
-          transform: translateX(20px);
-        }
-      }
-      
-      .removing {
-        animation: fadeOutRow 0.4s ease-out forwards;
-      }
-    </style>
-  </head>
-<body>
-  <header>
-    <select id="orderBy">
-      <option value="llm_score">llm_score</option>
-      <option value="scraping_date">scraping_date</option>
-      <option value="date_posted">date_posted</option>
-      <option value="company">company</option>
-      <option value="location">location</option>
-      <option value="title">title</option>
-    </select>
-    <label>Dir <select id="orderDir"><option value="DESC">DESC</option><option value="ASC">ASC</option></select></label>
-    <label>Table view <select id="mainFlagFilter">
-      <option value="not_viewed">Not viewed</option>
-      <option value="viewed">Viewed</option>
-      <option value="interested">Interested</option>
-      <option value="applied">Applied</option>
-    </select></label>
-    <button id="reload">Reload</button>
-    <button id="copyInterestedUrls">Copy URLs of interested</button>
-  </header>
-  <div class="meta" id="meta"></div>
-  <table><thead><tr>
-    <th>score</th><th>title</th><th>company</th><th>location</th><th>date_posted</th><th>scraping_date</th><th>url</th><th>motivazione</th><th>flag</th><th>note</th>
-  </tr></thead><tbody id="rows"></tbody></table>
-  <div style="margin-top:12px; display:flex; gap:8px; align-items:center;"><button id="prev">Prev</button><span id="pageInfo" class="meta"></span><button id="next">Next</button></div>
-  <script>
-    let page = 1;
-    const pageSize = 50;
-    const orderByEl = document.getElementById('orderBy');
-    const orderDirEl = document.getElementById('orderDir');
-    const mainFlagFilterEl = document.getElementById('mainFlagFilter');
-    const rowsEl = document.getElementById('rows');
-    const metaEl = document.getElementById('meta');
-    const pageInfoEl = document.getElementById('pageInfo');
-    function esc(x) {
-      return String(x ?? '').replace(/[<>&"']/g, c => ({'<':'&lt;','>':'&gt;','&':'&amp;','"':'&quot;',"'":'&#039;'}[c]));
-    }
-    function tronc(x, max=100) {
-      const s = String(x??'');
-      return s.length > max ? esc(s.slice(0,max))+'…' : esc(s);
-    }
-    async function load() {
-      const params = new URLSearchParams({
-        page: String(page),
-        page_size: String(pageSize),
-        order_by: orderByEl.value,
-        order_dir: orderDirEl.value,
-        mode: document.getElementById('mainFlagFilter').value,
-      });
-      try {
-        const res = await fetch('/jobs?' + params.toString());
-        if (!res.ok) throw new Error(`HTTP ${res.status}: ${res.statusText}`);
-        const data = await res.json();
-        rowsEl.innerHTML = '';
-        data.rows.forEach(r => {
-          const flagVal = r.applied ? 'applied' : r.interested ? 'interested' : r.viewed ? 'viewed' : 'not_viewed';
-          const tr = document.createElement('tr');
-          tr.innerHTML = `
-<td>${esc(r.llm_score)}</td>
-<td>${tronc(r.title,50)}</td>
-<td>${tronc(r.company,40)}</td>
-<td>${tronc(r.location,40)}</td>
-<td>${esc(r.date_posted)}</td>
-<td>${esc(r.scraping_date)}</td>
-<td>${r.job_url?`<a href="${esc(r.job_url)}" target="_blank">link</a>`:''}</td>
-<td title="${esc(r.llm_motivazione)}">${tronc(r.llm_motivazione,80)}</td>
-<td><select class="flag-select" data-id="${r.id}">
-<option value="not_viewed" ${flagVal === 'not_viewed' ? 'selected' : ''}>Not viewed</option>
-<option value="viewed" ${flagVal === 'viewed' ? 'selected' : ''}>Viewed</option>
-<option value="interested" ${flagVal === 'interested' ? 'selected' : ''}>Interested</option>
-<option value="applied" ${flagVal === 'applied' ? 'selected' : ''}>Applied</option>
-</select></td>
-<td><input type="text" value="${esc(r.notes)}" data-id="${r.id}" class="note" style="width:140px"/></td>
-  `;
-          rowsEl.appendChild(tr);
-          tr.querySelector('td[title]').style.cursor = 'pointer';
-          tr.querySelector('td[title]').onclick = function() {
-            showMotivazione(this.getAttribute('title'));
-          };
-        });
-        pageInfoEl.textContent = `Page ${data.page} / ${data.total_pages} — ${data.total_rows} rows`;
-        metaEl.textContent = `order_by=${orderByEl.value} ${orderDirEl.value} | mode=${document.getElementById('mainFlagFilter').value}`;
-        document.querySelectorAll('.flag-select').forEach(sel => {
-          sel.onchange = async function(e) {
-            const id = this.getAttribute('data-id');
-            const val = this.value;
-            const currentMode = mainFlagFilterEl.value;
-            const rowElement = this.closest('tr');
-            
-            const body = {
-              viewed: val === 'viewed',
-              interested: val === 'interested',
-              applied: val === 'applied'
-            };
-            
-            try {
-              const response = await fetch(`/jobs/${id}/flags`, {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify(body)
-              });
-              
-              if (!response.ok) {
-                const errorText = await response.text();
-                console.error('Update failed:', errorText);
-                alert(`Errore durante l'aggiornamento: ${errorText}`);
-                load();
-              } else {
-                console.log(`Flag aggiornato per job ${id}: ${val}`);
-                
-                // Verifica se la riga non appartiene più al filtro corrente
-                const shouldRemove = (
-                  (currentMode === 'not_viewed' && val !== 'not_viewed') ||
-                  (currentMode === 'viewed' && val !== 'viewed') ||
-                  (currentMode === 'interested' && val !== 'interested') ||
-                  (currentMode === 'applied' && val !== 'applied')
-                );
-                
-                if (shouldRemove) {
-                  // Applica l'animazione di fade-out
-                  rowElement.classList.add('removing');
-                  
-                  // Rimuovi l'elemento dal DOM dopo l'animazione
-                  setTimeout(() => {
-                    rowElement.remove();
-                    
-                    // Se non ci sono più righe, ricarica
-                    const remainingRows = rowsEl.querySelectorAll('tr').length;
-                    if (remainingRows === 0) {
-                      load();
-                    }
-                  }, 400);
-                }
-              }
-            } catch (error) {
-              console.error('Network error:', error);
-              alert(`Errore di rete: ${error.message}`);
-            }
-          };
-        });
-        document.querySelectorAll('.note').forEach(inp => inp.onchange = async e => {
-          const id = inp.getAttribute('data-id');
-          await fetch(`/jobs/${id}/flags`, {method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({note:inp.value})});
-        });
-      } catch (error) {
-        rowsEl.innerHTML = `<tr><td colspan="10" style="color:red;">Error: ${error.message}</td></tr>`;
-        pageInfoEl.textContent = 'Error loading data';
-        metaEl.textContent = 'Error';
-      }
-    }
-    document.getElementById('reload').onclick = () => { page = 1; load(); };
-    document.getElementById('prev').onclick = () => { if(page>1){page--;load();}};
-    document.getElementById('next').onclick = () => {page++;load();};
-    document.getElementById('mainFlagFilter').onchange = () => { page = 1; load(); };
-    document.getElementById('copyInterestedUrls').onclick = async () => {
-      // Trova tutte le righe con il dropdown impostato su "interested"
-      const interestedSelects = Array.from(document.querySelectorAll('.flag-select'))
-        .filter(sel => sel.value === 'interested');
-      
-      const urls = [];
-      interestedSelects.forEach(sel => {
-        const row = sel.closest('tr');
-        const linkEl = row.querySelector('a[href]');
-        if (linkEl) {
-          urls.push(linkEl.href);
-        }
-      });
-      
-      if (urls.length > 0) { 
-        await navigator.clipboard.writeText(urls.join('\\n')); 
-        alert(`Copied ${urls.length} URLs to clipboard`); 
-      } else { 
-        alert('No viewed jobs with URLs in current view'); 
-      }
-    };
-    load();
-    // Modal per visualizzare motivazione completa
-    function showMotivazione(text) {
-      const overlay = document.createElement('div');
-      overlay.style.cssText = `
-        position:fixed;
-        top:0;left:0;width:100%;height:100%;
-        background:rgba(0,0,0,0.7);
-        display:flex;
-        align-items:center;
-        justify-content:center;
-        z-index:1000;
-      `;
-      
-      const modal = document.createElement('div');
-      modal.style.cssText = `
-        background:#2a2a2a;
-        color:#f0f0f0;
-        padding:24px;
-        border-radius:12px;
-        max-width:1000px;
-        max-height:80vh;
-        overflow-y:auto;
-        box-shadow:0 0 20px rgba(0,0,0,0.6);
-      `;
-      
-      // Split sui marcatori delle sezioni
-      const sections = text.split(/(\*\*Punti Positivi \(\+\):\*\*|\*\*Punti Negativi \(-\):\*\*|\*\*Analisi Punteggi:\*\*)/);
-      
-      let currentBg = '';
-      sections.forEach(section => {
-        if (section.includes('Punti Positivi')) {
-          currentBg = '#245c3a';
-        } else if (section.includes('Punti Negativi')) {
-          currentBg = '#5c2a2a';
-        } else if (section.includes('Analisi Punteggi')) {
-          currentBg = '#24465c';
-        }
-        if (section.trim() && !section.startsWith('**')) {
-          const div = document.createElement('div');
-          div.style.cssText = `
-            background:${currentBg};
-            padding:12px;
-            margin:8px 0;
-            border-radius:8px;
-            white-space:pre-wrap;
-          `;
-          // Converti **testo** in grassetto, rimuovi :* e normalizza spazi multipli
-          let htmlContent = section.trim()
-            .replace(/\*\*(.+?)\*\*/g, '<strong>$1</strong>')  // Grassetti **testo**
-            .replace(/:\*/g, ':')  // Rimuove * dopo i due punti (:* -> :)
-            .replace(/\*\s{2,}/g, '* ');  // Normalizza spazi multipli dopo * a uno spazio singolo
-          
-          div.innerHTML = htmlContent;
-          modal.appendChild(div);
-        } else if (section.startsWith('**')) {
-          const title = document.createElement('h3');
-          title.style.cssText = `
-            margin:16px 0 8px 0;
-            color:#fff;
-            border-bottom:1px solid #444;
-            padding-bottom:4px;
-          `;
-          // Rimuovi gli asterischi dal titolo
-          title.textContent = section.replace(/\*\*/g, '');
-          modal.appendChild(title);
-        }
-      });
-      
-      overlay.onclick = () => overlay.remove();
-      overlay.appendChild(modal);
-      modal.onclick = (e) => e.stopPropagation();
-      document.body.appendChild(overlay);
-    }
+def index(request: Request) -> Response:
+    if request.headers.get("if-none-match") == _INDEX_ETAG:
+        return Response(status_code=304, headers=_INDEX_HEADERS)
+    # Versione gzip precalcolata: il GZipMiddleware salta le risposte con Content-Encoding già impostato
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(
+            content=_INDEX_GZIP,
+            media_type="text/html",
+            headers={**_INDEX_HEADERS, "Content-Encoding": "gzip"},
+        )
+    return Response(content=_INDEX_BYTES, media_type="text/html", headers=_INDEX_HEADERS)
+
+
+if __name__ == "__main__":
+    import uvicorn
 
-  </script>
-</body></html>'''
\ No newline at end of file
+    uvicorn.run(
+        "api.server:app",
+        host="127.0.0.1",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+        workers=os.cpu_count(),
+    )
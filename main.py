@@ -2,30 +2,30 @@
 Main script per il scraping di job da multiple fonti
 """
 
+import asyncio
+import functools
+import os
+import sqlite3
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
-from scrapers import scrape_all_locations, fetch_hiring_cafe_dataframe
-from scrapers.utils import get_expected_columns, combine_sources
+from scrapers import scrape_location_async, fetch_hiring_cafe_dataframe
+from scrapers.utils import get_expected_columns, combine_sources, drop_cross_site_duplicates
 from scrapers.llm import initialize_api_keys, enrich_dataframe_with_llm
 from storage.sqlite_db import get_db_path, get_jobs_to_enrich, upsert_jobs, get_connection
 
 
-def load_env_from_root():
-    """Carica variabili d'ambiente dal .env"""
-    import os
-    from scrapers.llm import initialize_api_keys
-    
+@functools.lru_cache(maxsize=1)
+def _load_env_cached() -> tuple[str, ...]:
+    """Legge il .env (una sola volta per processo) e restituisce le API key Gemini configurate."""
     project_root = Path(__file__).parent
     env_file = project_root / ".env"
     
     if env_file.exists():
-        with open(env_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ[key.strip()] = value.strip()
+        # Lettura unica + comprehension: coppie chiave=valore, righe vuote e commenti ignorati
+        lines = (line.strip() for line in env_file.read_text(encoding='utf-8').splitlines())
+        env_pairs = (line.split('=', 1) for line in lines if line and not line.startswith('#') and '=' in line)
+        os.environ.update({key.strip(): value.strip() for key, value in env_pairs})
     
     # Carica multiple keys
     api_keys = []
@@ -43,9 +43,15 @@ def load_env_from_root():
     if not api_keys:
         raise RuntimeError("Nessuna API key trovata nel .env")
     
+    return tuple(api_keys)
+
+
+def load_env_from_root():
+    """Carica variabili d'ambiente dal .env"""
+    api_keys = _load_env_cached()
     # la variabile 'is_free' non è più necessaria (dead code eliminato)
     print(f"🔑 Progetti configurati: {len(api_keys)}")
-    initialize_api_keys(api_keys)
+    initialize_api_keys(list(api_keys))
 
 
 # Lista delle città italiane da cercare
@@ -67,6 +73,11 @@ locations = [
         "Caserta, Campania",        #
 ]
 
+# Colonne dello schema finale: calcolate una volta all'import (lo schema è fisso)
+_EXPECTED_COLS, _ = get_expected_columns()
+EXPECTED_COLS: tuple[str, ...] = tuple(_EXPECTED_COLS)
+
+
 jobspy_search_term = (
     '(data OR python OR java OR backend OR software OR machine OR learning OR AI OR ML OR ETL OR big data) '
     '(engineer OR developer OR scientist) '
@@ -75,10 +86,95 @@ jobspy_search_term = (
     'langchain OR haystack OR llm OR git OR spring OR kafka OR microservices OR arangodb OR pinecone) '
     '-senior -lead -manager -architect -principal'
 )
+# JobSpy (Indeed/LinkedIn/Glassdoor): se disattivato la libreria non viene nemmeno importata
+ENABLE_JOBSPY = True
+
+
+# HiringCafe (API diretta): disattivato di default, filtri di ruolo/seniority già nel payload della ricerca
+ENABLE_HIRINGCAFE = False
+hiringcafe_search_query = ""
+
+
+# Località JobSpy scaricate contemporaneamente (limite verso i siti)
+MAX_PARALLEL_LOCATIONS = 4
+# Ritardo casuale massimo (s) prima di ogni località: sfalsa le richieste verso gli stessi siti
+LOCATION_START_JITTER = 1.0
+
+
+async def _scrape_producer(queue: asyncio.Queue) -> None:
+    """Scarica ogni località (e HiringCafe) in thread separati e accoda i DataFrame appena pronti."""
+    semaphore = asyncio.Semaphore(MAX_PARALLEL_LOCATIONS)
+    scrape_params = {'search_term': jobspy_search_term, 'hours_old': 26, 'results_wanted': 60} # hours_old:results_wanted -> 26:60, 60:120, 128:150
+
+    async def scrape_location(location: str) -> None:
+        df = await scrape_location_async(location, semaphore, start_jitter=LOCATION_START_JITTER, **scrape_params)
+        if df is not None and not df.empty:
+            await queue.put(df)
+
+    async def scrape_hiringcafe() -> None:
+        try:
+            df = await asyncio.to_thread(
+                fetch_hiring_cafe_dataframe,
+                expected_columns=list(EXPECTED_COLS),
+                search_query=hiringcafe_search_query,
+                date_filter="1_day",
+                max_pages=3,
+            )
+        except Exception as e:
+            print(f"[HiringCafe] Scraping interrotto: {e}")
+            return
+        if df is not None and not df.empty:
+            await queue.put(df)
+
+    tasks = []
+    if ENABLE_JOBSPY:
+        print("=== INIZIO SCRAPING JOBSPY ===")
+        tasks.extend(scrape_location(location) for location in locations)
+    if ENABLE_HIRINGCAFE:
+        print("\n=== INIZIO SCRAPING HIRINGCAFE ===")
+        tasks.append(scrape_hiringcafe())
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        await queue.put(None)  # Fine dello stream per il consumer
+
+
+async def _enrich_consumer(queue: asyncio.Queue, scraping_date: str, conn: sqlite3.Connection) -> list[pd.DataFrame]:
+    """Arricchisce con l'LLM i job nuovi di ogni DataFrame in arrivo, mentre lo scraping prosegue."""
+    seen_ids: set[str] = set()
+    seen_job_keys: set[str] = set()
+    enriched: list[pd.DataFrame] = []
+    first_batch = True
+    scraping_date_dtype = pd.CategoricalDtype([scraping_date])
+
+    while (df := await queue.get()) is not None:
+        # Deduplicazione anche rispetto alle località/fonti già ricevute
+        df = combine_sources(df, expected_columns=EXPECTED_COLS, seen_ids=seen_ids)
+        # Stessa offerta su Indeed/LinkedIn/Glassdoor (id diversi): una sola chiamata LLM
+        df = drop_cross_site_duplicates(df, seen_keys=seen_job_keys)
+        if df.empty:
+            continue
+        # Valore unico per tutta l'esecuzione: categoria singola (un codice int8 per riga)
+        df['scraping_date'] = pd.Series(scraping_date, index=df.index, dtype=scraping_date_dtype)
+
+        jobs_to_enrich = await asyncio.to_thread(get_jobs_to_enrich, df, conn)
+        if jobs_to_enrich.empty:
+            continue
+        # Il contatore delle quote RPD si azzera solo al primo lotto dell'esecuzione
+        enriched.append(
+            await asyncio.to_thread(enrich_dataframe_with_llm, jobs_to_enrich, reset_rpd=first_batch)
+        )
+        first_batch = False
 
+    return enriched
 
-def main():
-    """Funzione principale che coordina tutti gli scraper"""
+
+async def main():
+    """Funzione principale che coordina tutti gli scraper.
+
+    Scraping e arricchimento LLM sono sovrapposti: i job di ogni località vengono
+    valutati appena scaricati, mentre le altre località sono ancora in corso.
+    """
     
     # === Setup ===
     load_env_from_root()
@@ -86,58 +182,34 @@ def main():
     scraping_date = datetime.now().strftime("%Y-%m-%d")
     print(f"[DATA] Data di scraping: {scraping_date}")
     
-    expected_columns, _ = get_expected_columns()
-    
-    # === Scraping ===
-    print("=== INIZIO SCRAPING JOBSPY ===")
-    jobspy_df = scrape_all_locations(
-        locations=locations,
-        search_term=jobspy_search_term,
-        hours_old=26,
-        results_wanted=60
-    ) # hours_old:results_wanted -> 26:60, 60:120, 128:150
-    
-    # print("\n=== INIZIO SCRAPING HIRINGCAFE ===")
-    hiring_df = None
-    # hiring_df = fetch_hiring_cafe_dataframe(...)
-    
-    # === Combinazione fonti ===
-    print(f"\n=== COMBINAZIONE FONTI ===")
-    all_sources = combine_sources(jobspy_df, hiring_df, expected_columns=expected_columns)
-    
-    if all_sources.empty:
-        print("⚠️  Nessun job da processare.")
-        return
-    
-    all_sources['scraping_date'] = scraping_date
-    
-    # === Identifica job da arricchire ===
-    jobs_to_enrich = get_jobs_to_enrich(all_sources)
-    
-    if jobs_to_enrich.empty:
-        print("Nessun job da arricchire.")
-        return
-    
-    # === Arricchimento LLM ===
-    # print(f"\nProcessando {len(jobs_to_enrich)} job con LLM...")
-    enriched_jobs = enrich_dataframe_with_llm(jobs_to_enrich)
-    
-    # === Salvataggio ===
-    print(f"\n=== SALVATAGGIO NEL DATABASE ===")
-    inserted, updated = upsert_jobs(get_db_path(), enriched_jobs, batch_size=2000)
-    print(f"✅ DB aggiornato: {inserted} nuovi, {updated} aggiornati")
-    
-    # === Verifica job NULL residui ===
-    try:
-        with get_connection(get_db_path()) as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT COUNT(*) FROM jobs WHERE llm_score IS NULL")
-            remaining_null = cur.fetchone()[0]
+    # Una sola connessione per tutta l'esecuzione (verifica ID, upsert, controllo NULL);
+    # usata dai thread di asyncio.to_thread, mai in parallelo
+    with get_connection(get_db_path(), check_same_thread=False) as conn:
+        # === Scraping + arricchimento LLM (pipeline producer/consumer) ===
+        queue: asyncio.Queue = asyncio.Queue()
+        _, enriched = await asyncio.gather(
+            _scrape_producer(queue),
+            _enrich_consumer(queue, scraping_date, conn),
+        )
+        
+        if not enriched:
+            print("Nessun job da arricchire.")
+            return
+        enriched_jobs = pd.concat(enriched, ignore_index=True)
+        
+        # === Salvataggio ===
+        print(f"\n=== SALVATAGGIO NEL DATABASE ===")
+        inserted, updated = upsert_jobs(conn, enriched_jobs, batch_size=2000)
+        print(f"✅ DB aggiornato: {inserted} nuovi, {updated} aggiornati")
+        
+        # === Verifica job NULL residui ===
+        try:
+            remaining_null = conn.execute("SELECT COUNT(*) FROM jobs WHERE llm_score IS NULL").fetchone()[0]
             print(f"📊 Job con llm_score NULL rimasti nel DB: {remaining_null}")
-    except Exception as e:
-        # print(f"⚠️  Errore verifica job NULL: {e}")
-        print(f"⚠️ Verifica NULL fallita")
+        except Exception as e:
+            # print(f"⚠️  Errore verifica job NULL: {e}")
+            print(f"⚠️ Verifica NULL fallita")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
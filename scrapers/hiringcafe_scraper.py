@@ -2,8 +2,13 @@
 HiringCafe scraper module
 """
 
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 import pandas as pd
 from scrapers.utils import clean_html_text
 
@@ -23,20 +28,43 @@ DATE_FILTERS = {
 }
 
 
-def search_hiring_cafe(search_query: str = "", date_filter="1_week", page: int = 0, max_retries: int = 3):
-    """Versione ridotta della ricerca HiringCafe API con retry automatico"""
+SEARCH_URL = "https://hiring.cafe/api/search-jobs"
+PAGE_SIZE = 100  # risultati per pagina richiesti all'API
+
 
-    url = "https://hiring.cafe/api/search-jobs"
+def _create_session() -> requests.Session:
+    """Sessione HTTP condivisa: header statici impostati una volta e connessioni keep-alive riusate tra le pagine.
 
-    headers = {
+    Le risposte 429/5xx vengono ritentate dall'adapter con backoff esponenziale,
+    rispettando l'header Retry-After; esauriti i tentativi, la risposta torna al chiamante.
+    """
+    session = requests.Session()
+    session.headers.update({
         "Content-Type": "application/json",
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:143.0) Gecko/20100101 Firefox/143.0",
         "Origin": "https://hiring.cafe",
         "Referer": "https://hiring.cafe/",
-    }
+    })
+    retry = Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST"],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=20, max_retries=retry))
+    return session
+
+
+_SESSION = _create_session()
+
+
+def search_hiring_cafe(search_query: str = "", date_filter="1_week", page: int = 0, max_retries: int = 3):
+    """Versione ridotta della ricerca HiringCafe API con retry automatico"""
 
     payload = {
-        "size": 100, # n risultati per pagina
+        "size": PAGE_SIZE, # n risultati per pagina
         "page": page,
         "searchState": {
             "searchQuery": search_query,
@@ -63,15 +91,17 @@ def search_hiring_cafe(search_query: str = "", date_filter="1_week", page: int =
     for attempt in range(1, max_retries + 1):
         try:
             timeout = 30 + (attempt - 1) * 10  # timeout crescente: 30, 40, 50s
-            response = requests.post(url, headers=headers, json=payload, timeout=timeout)
+            response = _SESSION.post(SEARCH_URL, json=payload, timeout=timeout)
             if response.status_code == 200:
-                return response.json()
+                # Parsing JSON in Rust (orjson): risposte da 100 job con oggetti annidati
+                return orjson.loads(response.content)
             else:
                 print(f"[HiringCafe] Pagina {page} - HTTP {response.status_code} al tentativo {attempt}")
         except Exception as e:
             if attempt < max_retries:
-                wait_time = 2 ** attempt  # 2, 4, 8 secondi
-                print(f"[HiringCafe] Errore pagina {page} tentativo {attempt}/{max_retries}: {e}. Retry tra {wait_time}s")
+                # 2, 4, 8 secondi + jitter: le pagine in parallelo non ritentano tutte insieme
+                wait_time = 2 ** attempt + random.uniform(0, 0.5)
+                print(f"[HiringCafe] Errore pagina {page} tentativo {attempt}/{max_retries}: {e}. Retry tra {wait_time:.1f}s")
                 time.sleep(wait_time)
             else:
                 print(f"[HiringCafe] Errore pagina {page} dopo {max_retries} tentativi: {e}")
@@ -79,167 +109,202 @@ def search_hiring_cafe(search_query: str = "", date_filter="1_week", page: int =
     return None
 
 
-def normalize_hiring_cafe_jobs_to_schema(jobs: list[dict], expected_columns: list[str]) -> pd.DataFrame:
-    """Mappa i job HiringCafe (schema results[v5_processed_job_data,...]) allo schema DataFrame standard."""
-
-    # Helper per serializzare liste in una singola stringa contenente TUTTI i valori
-    def join_all(values, sep: str = "; "):
-        if isinstance(values, list):
-            return sep.join([str(v) for v in values if v is not None]) if values else None
-        return values
-
-    def map_one(job: dict) -> dict:
-        job_data = job.get("v5_processed_job_data", {}) or {}
-        company_data = job.get("v5_processed_company_data", {}) or {}
-        job_info = job.get("job_information", {}) or {}
-
-        # Id e URL
-        raw_id = job.get("id") or job.get("objectID")
-        job_id = f"hc-{raw_id}" if raw_id else None
-        apply_url = job.get("apply_url")
-
-        # Titolo / azienda
-        title = job_info.get("title") or job_info.get("job_title_raw")
-        company_name = job_data.get("company_name") or company_data.get("name")
-
-        # Location
-        location = job_data.get("formatted_workplace_location")
-        if not location:
-            cities = job_data.get("workplace_cities")
-            if isinstance(cities, list) and cities:
-                location = ", ".join(cities)
-
-        # Data pubblicazione
-        date_posted = job_data.get("estimated_publish_date")
-        if date_posted:
-            date_posted = date_posted.split("T")[0]
-
-        # Job type e remoto
-        commitment_all = job_data.get("commitment")
-        # Manteniamo job_type singolo (se c'è un solo elemento), altrimenti serializziamo tutti
-        if isinstance(commitment_all, list):
-            job_type = "; ".join([str(c).lower() for c in commitment_all]) if commitment_all else None
-        else:
-            job_type = str(commitment_all).lower() if commitment_all else None
-        workplace_type = job_data.get("workplace_type")  # e.g., Remote/Hybrid/On-site
-        is_remote = True if str(workplace_type).lower() == "remote" else False
+# Campi letti da ogni sezione del job HiringCafe (solo questi vengono estratti)
+_TOP_LEVEL_KEYS = ("id", "objectID", "apply_url")
+_COMPENSATION_KEYS = tuple(
+    f"{period}_{bound}_compensation"
+    # Cascata del compenso: Yearly > Monthly > Weekly > Daily > Hourly > Bi-weekly
+    for bound in ("min", "max")
+    for period in ("yearly", "monthly", "weekly", "daily", "hourly", "bi-weekly")
+)
+_SECTION_KEYS = {
+    "v5_processed_job_data": (
+        "company_name", "formatted_workplace_location", "workplace_cities", "estimated_publish_date",
+        "commitment", "workplace_type", "listed_compensation_currency", "listed_compensation_frequency",
+        "seniority_level", "job_category", "technical_tools", "company_website", "company_tagline",
+        "language_requirements", "role_activities",
+    ) + _COMPENSATION_KEYS,
+    "v5_processed_company_data": (
+        "name", "website", "image_url", "industries", "activities", "num_employees", "latest_revenue", "tagline",
+    ),
+    "job_information": ("title", "job_title_raw", "description"),
+}
+_JOB = "v5_processed_job_data."
+_COMPANY = "v5_processed_company_data."
+_INFO = "job_information."
+_MIN_COMPENSATION_COLUMNS = tuple(f"{_JOB}{k}" for k in _COMPENSATION_KEYS if "_min_" in k)
+_MAX_COMPENSATION_COLUMNS = tuple(f"{_JOB}{k}" for k in _COMPENSATION_KEYS if "_max_" in k)
+
+
+def _join_all(values, sep: str = "; "):
+    """Serializza una lista in una singola stringa contenente TUTTI i valori."""
+    if isinstance(values, list):
+        return sep.join([str(v) for v in values if v is not None]) if values else None
+    return values
+
+
+def _join_commitment(values):
+    """job_type: tutti i commitment in minuscolo (lista) o il valore singolo."""
+    if isinstance(values, list):
+        return "; ".join([str(c).lower() for c in values]) if values else None
+    return str(values).lower() if values else None
+
+
+def _join_cities(cities):
+    """location di ripiego: elenco delle città di lavoro."""
+    return ", ".join(cities) if isinstance(cities, list) and cities else None
+
+
+def _join_skills(tools):
+    """skills: strumenti tecnici separati da virgola."""
+    return ", ".join(tools) if isinstance(tools, list) else None
 
-        # Descrizione (HTML) - pulita dai tag HTML/CSS
-        description_raw = job_info.get("description")
-        description = clean_html_text(description_raw)
-
-        # Compenso
-        currency = job_data.get("listed_compensation_currency")
-        interval = job_data.get("listed_compensation_frequency")  # e.g., Yearly/Monthly
-        # Scegliamo min/max nell'ordine Yearly > Monthly > Weekly > Daily > Hourly
-        min_amount = (
-            job_data.get("yearly_min_compensation")
-            or job_data.get("monthly_min_compensation")
-            or job_data.get("weekly_min_compensation")
-            or job_data.get("daily_min_compensation")
-            or job_data.get("hourly_min_compensation")
-            or job_data.get("bi-weekly_min_compensation")
-        )
-        max_amount = (
-            job_data.get("yearly_max_compensation")
-            or job_data.get("monthly_max_compensation")
-            or job_data.get("weekly_max_compensation")
-            or job_data.get("daily_max_compensation")
-            or job_data.get("hourly_max_compensation")
-            or job_data.get("bi-weekly_max_compensation")
-        )
-
-        # Seniority / funzione / skills
-        job_level = job_data.get("seniority_level")
-        job_function = job_data.get("job_category")
-        technical_tools = job_data.get("technical_tools")
-        skills = ", ".join(technical_tools) if isinstance(technical_tools, list) else None
-
-        # Campi multi-valore aggiuntivi (tutti i campi, non solo il primo)
-        company_industries_all = join_all((job.get("v5_processed_company_data", {}) or {}).get("industries"))
-        company_activities_all = join_all((job.get("v5_processed_company_data", {}) or {}).get("activities"))
-        language_requirements_all = join_all(job_data.get("language_requirements"))
-        role_activities_all = join_all(job_data.get("role_activities"))
-
-        mapped = {
-            "id": job_id,
-            "site": "hiring_cafe",
-            "job_url": apply_url,
-            "job_url_direct": apply_url,
-            "title": title,
-            "company": company_name,
-            "location": location,
-            "date_posted": date_posted,
-            "job_type": job_type,
-            "interval": interval,
-            "min_amount": min_amount,
-            "max_amount": max_amount,
-            "currency": currency,
-            "is_remote": is_remote,
-            "job_level": job_level,
-            "job_function": job_function,
-            #"emails": None,
-            "description": description,
-            "company_url": company_data.get("website") or job_data.get("company_website"),
-            "company_logo": company_data.get("image_url"),
-            "company_industries": company_industries_all,
-            "company_activities": company_activities_all,
-            "company_num_employees": company_data.get("num_employees"),
-            "company_revenue": company_data.get("latest_revenue"),
-            "company_description": company_data.get("tagline") or job_data.get("company_tagline"),
-            "skills": skills,
-            "work_from_home_type": workplace_type,
-            "language_requirements": language_requirements_all,
-            "role_activities": role_activities_all,
-        }
 
-        # Riduci alle colonne attese, riempi mancanti a None
-        out = {col: mapped.get(col) for col in expected_columns}
-        for col in expected_columns:
-            if col not in out:
-                out[col] = None
-        return out
+def _date_only(value):
+    """Data di pubblicazione senza la parte oraria (ISO 8601)."""
+    return value.split("T")[0] if value else value
 
-    rows = [map_one(j) for j in jobs]
-    if not rows:
+
+def _flatten_jobs(jobs: list[dict]) -> pd.DataFrame:
+    """Appiattisce un livello dei job in colonne `sezione.chiave` (solo i campi usati).
+
+    Un costruttore DataFrame per sezione: l'estrazione list-of-dict avviene in pandas,
+    senza le copie profonde di `pd.json_normalize`.
+    """
+    # Colonne di primo livello come object: id interi misti a valori mancanti non diventano float (5 -> 5.0)
+    frames = [pd.DataFrame(jobs, columns=list(_TOP_LEVEL_KEYS), dtype=object)]
+    for section, keys in _SECTION_KEYS.items():
+        section_df = pd.DataFrame([job.get(section) or {} for job in jobs], columns=list(keys))
+        frames.append(section_df.add_prefix(f"{section}."))
+    return pd.concat(frames, axis=1)
+
+
+def _truthy(series: pd.Series) -> pd.Series:
+    """Maschera equivalente a `bool(valore)` per elemento, con NaN (chiave assente) falso."""
+    return series.notna() & series.map(bool, na_action="ignore").fillna(False).astype(bool)
+
+
+def _first_truthy(flat: pd.DataFrame, *columns: str) -> pd.Series:
+    """Equivalente per colonna di `a or b or c`: primo valore vero, altrimenti l'ultimo."""
+    result = flat[columns[0]]
+    for col in columns[1:]:
+        result = result.where(_truthy(result), flat[col])
+    return result
+
+
+def normalize_hiring_cafe_jobs_to_schema(jobs: list[dict], expected_columns: list[str]) -> pd.DataFrame:
+    """Mappa i job HiringCafe (schema results[v5_processed_job_data,...]) allo schema DataFrame standard.
+
+    I job vengono appiattiti una sola volta e ogni campo è calcolato per colonna
+    (fallback `a or b` inclusi) invece che job per job.
+    """
+    if not jobs:
         return pd.DataFrame(columns=expected_columns)
-    df = pd.DataFrame(rows)
+    flat = _flatten_jobs(jobs)
+
+    # Id
+    raw_id = _first_truthy(flat, "id", "objectID")
+    # Formattato valore per valore come `f"hc-{id}"` (nessuna conversione di tipo sulla colonna)
+    job_id = raw_id.map(lambda v: f"hc-{v}", na_action="ignore").where(_truthy(raw_id), None)
+
+    # Location: indirizzo formattato, altrimenti elenco delle città
+    location = flat[f"{_JOB}formatted_workplace_location"]
+    cities = flat[f"{_JOB}workplace_cities"].map(_join_cities)
+    location = location.where(_truthy(location) | cities.isna(), cities)
+
+    # Data pubblicazione (solo la parte data)
+    date_posted = flat[f"{_JOB}estimated_publish_date"].map(_date_only, na_action="ignore")
+
+    workplace_type = flat[f"{_JOB}workplace_type"]  # e.g., Remote/Hybrid/On-site
+
+    df = pd.DataFrame({
+        "id": job_id,
+        "site": "hiring_cafe",
+        "job_url": flat["apply_url"],
+        "job_url_direct": flat["apply_url"],
+        "title": _first_truthy(flat, f"{_INFO}title", f"{_INFO}job_title_raw"),
+        "company": _first_truthy(flat, f"{_JOB}company_name", f"{_COMPANY}name"),
+        "location": location,
+        "date_posted": date_posted,
+        "job_type": flat[f"{_JOB}commitment"].map(_join_commitment, na_action="ignore"),
+        "interval": flat[f"{_JOB}listed_compensation_frequency"],  # e.g., Yearly/Monthly
+        "min_amount": _first_truthy(flat, *_MIN_COMPENSATION_COLUMNS),
+        "max_amount": _first_truthy(flat, *_MAX_COMPENSATION_COLUMNS),
+        "currency": flat[f"{_JOB}listed_compensation_currency"],
+        "is_remote": workplace_type.astype(str).str.lower().eq("remote"),
+        "job_level": flat[f"{_JOB}seniority_level"],
+        "job_function": flat[f"{_JOB}job_category"],
+        # Descrizione (HTML) - pulita dai tag HTML/CSS
+        "description": flat[f"{_INFO}description"].map(clean_html_text),
+        "company_url": _first_truthy(flat, f"{_COMPANY}website", f"{_JOB}company_website"),
+        "company_logo": flat[f"{_COMPANY}image_url"],
+        # Campi multi-valore (tutti i valori, non solo il primo)
+        "company_industries": flat[f"{_COMPANY}industries"].map(_join_all),
+        "company_activities": flat[f"{_COMPANY}activities"].map(_join_all),
+        "company_num_employees": flat[f"{_COMPANY}num_employees"],
+        "company_revenue": flat[f"{_COMPANY}latest_revenue"],
+        "company_description": _first_truthy(flat, f"{_COMPANY}tagline", f"{_JOB}company_tagline"),
+        "skills": flat[f"{_JOB}technical_tools"].map(_join_skills),
+        "work_from_home_type": workplace_type,
+        "language_requirements": flat[f"{_JOB}language_requirements"].map(_join_all),
+        "role_activities": flat[f"{_JOB}role_activities"].map(_join_all),
+    })
+
+    # Riduci alle colonne attese, riempi mancanti a None
+    df = df.reindex(columns=expected_columns)
     if "is_remote" in df.columns:
         df["is_remote"] = df["is_remote"].astype(bool)
     return df
 
 
-def fetch_hiring_cafe_dataframe(expected_columns: list[str], search_query: str, date_filter:str = "1_week", max_pages: int = 5) -> pd.DataFrame:
+def fetch_hiring_cafe_dataframe(expected_columns: list[str], search_query: str, date_filter:str = "1_week", max_pages: int = 5, max_workers: int = 4) -> pd.DataFrame:
     """
     Fetch completo da HiringCafe con paginazione.
     
+    Dopo la prima pagina, le successive vengono richieste in parallelo (speculativamente,
+    fino a max_pages) e lette in ordine: alla prima pagina vuota o parziale
+    (meno di PAGE_SIZE risultati) le successive vengono scartate.
+    
     Args:
         expected_columns: Colonne attese per il DataFrame finale
         search_query: Query di ricerca
         max_pages: Numero massimo di pagine da scaricare
+        max_workers: Pagine richieste contemporaneamente
         
     Returns:
         DataFrame con tutti i job unici trovati
     """
-    all_jobs = []
-    for page in range(max_pages):
+    def fetch_page(page: int) -> list[dict] | None:
         data = search_hiring_cafe(search_query=search_query, date_filter=date_filter, page=page)
-        jobs = (data or {}).get("results") if isinstance(data, dict) else None
-        if not jobs:
-            if page == 0:
-                print("[HiringCafe] Nessun risultato nella prima pagina")
-            break
-        print(f"[HiringCafe] Pagina {page}: {len(jobs)} annunci")
-        all_jobs.extend(jobs)
-        time.sleep(0.5)
+        return (data or {}).get("results") if isinstance(data, dict) else None
+
+    all_jobs = []
+    # Prima pagina da sola: se è parziale è anche l'ultima e non servono altre richieste
+    first_page = fetch_page(0) if max_pages > 0 else None
+    if not first_page:
+        print("[HiringCafe] Nessun risultato nella prima pagina")
+    else:
+        print(f"[HiringCafe] Pagina 0: {len(first_page)} annunci")
+        all_jobs.extend(first_page)
+        if len(first_page) == PAGE_SIZE and max_pages > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, max_pages - 1)) as executor:
+                for page, jobs in enumerate(executor.map(fetch_page, range(1, max_pages)), start=1):
+                    if not jobs:
+                        break
+                    print(f"[HiringCafe] Pagina {page}: {len(jobs)} annunci")
+                    all_jobs.extend(jobs)
+                    # Pagina parziale: le successive sono vuote
+                    if len(jobs) < PAGE_SIZE:
+                        break
 
     if not all_jobs:
         print("[HiringCafe] Nessun job trovato")
         return pd.DataFrame(columns=expected_columns)
     
     df = normalize_hiring_cafe_jobs_to_schema(all_jobs, expected_columns)
-    # Togli eventuali duplicati senza id
-    df = df.dropna(subset=["id"]) if "id" in df.columns else df
-    df = df.drop_duplicates(subset=["id"], keep="first") if "id" in df.columns else df
+    # Togli righe senza id e duplicati in un'unica maschera (una passata, nessun DataFrame intermedio)
+    if "id" in df.columns:
+        ids = df["id"]
+        df = df.loc[ids.notna() & ~ids.duplicated(keep="first")]
     print(f"[HiringCafe] Totale unici: {len(df)}")
     return df
@@ -2,12 +2,26 @@
 JobSpy scraper module
 """
 
+import asyncio
+import random
+import re
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 import pandas as pd
-from jobspy import scrape_jobs
 from scrapers.utils import clean_html_text
 
 
+# Parametri statici comuni a tutte le chiamate scrape_jobs (costruiti una volta sola)
+_JOBSPY_BASE_KWARGS = {
+    'distance': 50,
+    'job_type': "fulltime",
+    'is_remote': False,
+    'linkedin_fetch_description': True,
+    'description_format': "markdown",
+    'verbose': 1,
+}
+
+
 def clean_jobspy_descriptions(df: pd.DataFrame) -> pd.DataFrame:
     """
     Pulisce le descrizioni HTML dai DataFrame di JobSpy.
@@ -28,6 +42,92 @@ def clean_jobspy_descriptions(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def _retry_delay(exc: Exception | None, attempt: int, base_delay: float, max_delay: float = 60.0) -> float:
+    """
+    Attesa prima del prossimo tentativo: backoff esponenziale con jitter (±20%, per non
+    far ritentare insieme le località in parallelo), oppure l'header Retry-After della
+    risposta (429/503) se l'eccezione HTTP lo espone.
+    """
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    retry_after = headers.get('Retry-After') or headers.get('x-ratelimit-reset')
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0.0), max_delay)
+        except (TypeError, ValueError):
+            pass  # Formato data HTTP o valore non numerico: backoff standard
+    return min(base_delay * (2 ** (attempt - 1)) * random.uniform(0.8, 1.2), max_delay)
+
+
+def _future_result(future: Future) -> tuple[pd.DataFrame | None, Exception | None]:
+    """Risultato di un future come (valore, errore), senza propagare l'eccezione."""
+    try:
+        return future.result(), None
+    except Exception as e:
+        return None, e
+
+
+def _scrape_location_once(location: str, search_term: str, hours_old: int, results_wanted: int) -> pd.DataFrame:
+    """
+    Un tentativo di scraping di una località (Indeed/LinkedIn + Glassdoor).
+    
+    Returns:
+        DataFrame con le descrizioni pulite (vuoto se nessun risultato)
+        
+    Raises:
+        Exception: se falliscono entrambe le ricerche
+    """
+    # Import al primo uso: jobspy (e le sue dipendenze) viene caricato solo se si scrapa davvero
+    from jobspy import scrape_jobs
+
+    # Indeed + LinkedIn (location originale: città + regione) e Glassdoor (sola città)
+    # sono siti indipendenti: le due ricerche girano in parallelo
+    city_only = location.split(",")[0].strip()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        future_il = executor.submit(
+            scrape_jobs,
+            site_name=["indeed", "linkedin"],
+            search_term=search_term,
+            location=location,
+            hours_old=hours_old,
+            results_wanted=results_wanted,
+            country_indeed='Italy',
+            **_JOBSPY_BASE_KWARGS,
+        )
+        future_gd = executor.submit(
+            scrape_jobs,
+            site_name=["glassdoor"],
+            search_term=search_term,
+            location=city_only,
+            hours_old=hours_old,
+            results_wanted=results_wanted,
+            **_JOBSPY_BASE_KWARGS,
+        )
+        df_il, err_il = _future_result(future_il)
+        df_gd, err_gd = _future_result(future_gd)
+
+    # Retry solo se falliscono entrambe: un successo parziale vale più di un nuovo tentativo
+    if err_il is not None and err_gd is not None:
+        raise err_il
+    for sites, err in (("Indeed/LinkedIn", err_il), ("Glassdoor", err_gd)):
+        if err is not None:
+            print(f"[{location}] {sites} fallito: {err}. Uso i risultati parziali")
+
+    # Filtro post-scrape solo per Glassdoor: location deve contenere una parola di city_only oppure Italia/Italy
+    if isinstance(df_gd, pd.DataFrame) and not df_gd.empty and 'location' in df_gd.columns:
+        # Un'unica regex (parole della città come parole intere, oppure Italia/Italy): una sola passata
+        tokens = [re.escape(t) for t in city_only.split() if t]
+        pattern = re.compile(r"\b(?:" + "|".join(tokens + ["italia", "italy"]) + r")\b", re.IGNORECASE)
+        mask = df_gd['location'].astype(str).str.contains(pattern, na=False)
+        df_gd = df_gd[mask]
+
+    frames = [d for d in [df_il, df_gd] if isinstance(d, pd.DataFrame) and not d.empty and len(d) > 0]
+    if not frames:
+        return pd.DataFrame()
+    # Pulisci le descrizioni HTML
+    return clean_jobspy_descriptions(pd.concat(frames, ignore_index=True))
+
+
 def scrape_location_with_retries(location: str, search_term: str, hours_old: int = 168, results_wanted: int = 500, max_retries: int = 3, base_delay: float = 2.0) -> pd.DataFrame | None:
     """
     Scraping di una singola località con retry automatico.
@@ -42,98 +142,89 @@ def scrape_location_with_retries(location: str, search_term: str, hours_old: int
     """
     for attempt in range(1, max_retries + 1):
         try:
-            # Indeed + LinkedIn con location originale (città + regione)
-            df_il = scrape_jobs(
-                site_name=["indeed", "linkedin"],
-                search_term=search_term,
-                location=location,
-                distance=50,
-                hours_old=hours_old,
-                results_wanted=results_wanted,
-                job_type="fulltime",
-                is_remote=False,
-                country_indeed='Italy',
-                linkedin_fetch_description=True,
-                description_format="markdown",
-                verbose=1,
-            )
-
-            # Glassdoor con sola città
-            city_only = location.split(",")[0].strip()
-            df_gd = scrape_jobs(
-                site_name=["glassdoor"],
-                search_term=search_term,
-                location=city_only,
-                distance=50,
-                hours_old=hours_old,
-                results_wanted=results_wanted,
-                job_type="fulltime",
-                is_remote=False,
-                linkedin_fetch_description=True,
-                description_format="markdown",
-                verbose=1,
-            )
-
-            # Filtro post-scrape solo per Glassdoor: location deve contenere una parola di city_only oppure Italia/Italy
-            if isinstance(df_gd, pd.DataFrame) and not df_gd.empty and 'location' in df_gd.columns:
-                import re
-                tokens = [t for t in city_only.split() if t]
-                loc_series = df_gd['location'].astype(str)
-                mask = loc_series.str.contains(r"italia|italy", case=False, na=False)
-                for tok in tokens:
-                    pattern = rf"\\b{re.escape(tok)}\\b"
-                    mask = mask | loc_series.str.contains(pattern, case=False, na=False)
-                df_gd = df_gd[mask]
-
-            frames = [d for d in [df_il, df_gd] if isinstance(d, pd.DataFrame) and not d.empty and len(d) > 0]
-            if frames:
-                df = pd.concat(frames, ignore_index=True)
-            else:
-                df = pd.DataFrame()
+            df = _scrape_location_once(location, search_term, hours_old, results_wanted)
         except Exception as e:
-            wait_s = base_delay * (2 ** (attempt - 1))
+            wait_s = _retry_delay(e, attempt, base_delay)
             print(f"[{location}] Errore tentativo {attempt}/{max_retries}: {e}. Retry tra {wait_s:.1f}s")
             time.sleep(wait_s)
             continue
 
-        if isinstance(df, pd.DataFrame) and not df.empty:
-            # Pulisci le descrizioni HTML
-            df = clean_jobspy_descriptions(df)
+        if not df.empty:
             print(f"[{location}] Successo: {len(df)} annunci")
             return df
+        wait_s = _retry_delay(None, attempt, base_delay)
+        print(f"[{location}] Nessun risultato al tentativo {attempt}. Retry tra {wait_s:.1f}s")
+        time.sleep(wait_s)
+
+    print(f"[{location}] Fallito dopo {max_retries} tentativi")
+    return None
+
+
+async def scrape_location_async(location: str, semaphore: asyncio.Semaphore, start_jitter: float = 1.0, search_term: str = "", hours_old: int = 168, results_wanted: int = 500, max_retries: int = 3, base_delay: float = 2.0) -> pd.DataFrame | None:
+    """
+    Variante asincrona di `scrape_location_with_retries`: ogni tentativo bloccante gira in un
+    thread (asyncio.to_thread), con al massimo `semaphore` località in volo.
+    
+    Le attese tra i tentativi sono asyncio.sleep (cancellabili) e avvengono fuori dal semaforo:
+    durante il backoff di una località le altre possono partire.
+    
+    Args:
+        location: Nome della città da cercare
+        semaphore: Limite condiviso di località contemporanee
+        start_jitter: Ritardo casuale massimo (s) prima di partire, per sfalsare le richieste
+        max_retries: Numero massimo di tentativi
+        base_delay: Delay base tra i retry (esponenziale, con jitter)
+        
+    Returns:
+        DataFrame con i job trovati o None se fallisce (gli errori non vengono propagati)
+    """
+    await asyncio.sleep(random.uniform(0, start_jitter))
+    for attempt in range(1, max_retries + 1):
+        try:
+            async with semaphore:
+                df = await asyncio.to_thread(_scrape_location_once, location, search_term, hours_old, results_wanted)
+        except Exception as e:
+            # Una località in errore non deve far perdere i risultati delle altre
+            wait_s = _retry_delay(e, attempt, base_delay)
+            print(f"[{location}] Errore tentativo {attempt}/{max_retries}: {e}. Retry tra {wait_s:.1f}s")
         else:
-            wait_s = base_delay * (2 ** (attempt - 1))
+            if not df.empty:
+                print(f"[{location}] Successo: {len(df)} annunci")
+                return df
+            wait_s = _retry_delay(None, attempt, base_delay)
             print(f"[{location}] Nessun risultato al tentativo {attempt}. Retry tra {wait_s:.1f}s")
-            time.sleep(wait_s)
+        await asyncio.sleep(wait_s)
 
     print(f"[{location}] Fallito dopo {max_retries} tentativi")
     return None
 
 
-def scrape_all_locations(locations: list[str], search_term: str, hours_old: int = 168, results_wanted: int = 500, max_retries: int = 3, base_delay: float = 3.0) -> pd.DataFrame:
-    scrape_params = {'search_term': search_term, 'hours_old': hours_old, 'results_wanted': results_wanted, 'max_retries': max_retries, 'base_delay': base_delay}
+async def scrape_all_locations(locations: list[str], search_term: str, hours_old: int = 168, results_wanted: int = 500, max_retries: int = 3, base_delay: float = 3.0, max_concurrency: int = 5) -> pd.DataFrame:
     """
-    Scraping di tutte le località specificate.
+    Scraping di tutte le località specificate, in parallelo (I/O-bound e indipendenti).
     
     Args:
         locations: Lista delle città da cercare
         max_retries: Numero massimo di tentativi per località
         base_delay: Delay base tra i retry
+        max_concurrency: Località in volo contemporaneamente (limite verso i siti, evita i 429)
         
     Returns:
         DataFrame combinato con tutti i job unici
     """
-    all_jobs = []
+    scrape_params = {'search_term': search_term, 'hours_old': hours_old, 'results_wanted': results_wanted, 'max_retries': max_retries, 'base_delay': base_delay}
+    semaphore = asyncio.Semaphore(max_concurrency)
     
-    for location in locations:
-        print(f"\n=== Scraping {location} ===")
-        df_loc = scrape_location_with_retries(location, **scrape_params)
-        if df_loc is not None:
-            all_jobs.append(df_loc)
-        # Pausa breve tra località per ridurre limiti
-        time.sleep(1.0)
+    print(f"\n=== Scraping di {len(locations)} località ({max_concurrency} in parallelo) ===")
+    # gather restituisce i risultati nell'ordine delle località: la deduplicazione tiene la stessa riga della versione sequenziale
+    results = await asyncio.gather(*(scrape_location_async(location, semaphore, **scrape_params) for location in locations))
+    all_jobs = [df for df in results if df is not None]
     
-    # Merge e deduplicazione
+    return _merge_location_frames(all_jobs)
+
+
+def _merge_location_frames(all_jobs: list[pd.DataFrame]) -> pd.DataFrame:
+    """Merge e deduplicazione dei DataFrame per località (ordine delle località preservato)."""
     if not all_jobs:
         print("\nNessun job valido trovato da jobspy.")
         return pd.DataFrame()
@@ -4,32 +4,41 @@ from __future__ import annotations
 import os
 import re
 import time
-import json
+import asyncio
+import functools
 from pathlib import Path
 from typing import Any, Dict, Optional, List
 from collections import deque
 from threading import Lock
 
 
+import orjson
 import pandas as pd
 from tqdm import tqdm
 from google import genai
 from google.genai import types as genai_types
 
+from .llm_cache import LLMResultCache, get_llm_cache, make_cache_key
+
 
 
 
 class PerKeyRateLimiter:
-    """Rate limiter che traccia separatamente ogni API key e modello"""
+    """Rate limiter che traccia separatamente ogni API key e modello (richieste e token al minuto)"""
     
-    def __init__(self, limits_per_model: Dict[str, int]):
+    def __init__(self, limits_per_model: Dict[str, int], tpm_per_model: Optional[Dict[str, int]] = None):
         """
         Args:
             limits_per_model: dizionario modello → RPM massimo.
                               Es. {"gemini-2.5-flash-lite": 10, "gemini-2.5-flash": 5}
+            tpm_per_model: dizionario modello → token al minuto massimi (opzionale).
+                           I token vengono registrati a posteriori con `record_tokens`.
         """
         self.limits = limits_per_model
+        self.tpm_limits = tpm_per_model or {}
         self.key_model_requests: Dict[str, deque] = {}  # chiave: "apikey::modelname"
+        self.key_model_tokens: Dict[str, deque] = {}  # chiave: "apikey::modelname" → (timestamp, token)
+        self.key_model_token_sum: Dict[str, int] = {}  # somma dei token nella finestra (aggiornata con la deque)
         self.key_model_total_count: Dict[str, int] = {}  # contatore storico per ogni bucket (Fix #2)
         self.lock = Lock()
     
@@ -44,19 +53,27 @@ class PerKeyRateLimiter:
         """
         bucket_key = f"{api_key}::{model_name}"
         max_requests = self.limits.get(model_name, 10)  # fallback conservativo
+        max_tokens = self.tpm_limits.get(model_name)
 
         while True:
             with self.lock:
                 if bucket_key not in self.key_model_requests:
                     self.key_model_requests[bucket_key] = deque()
                 requests = self.key_model_requests[bucket_key]
+                tokens = self.key_model_tokens.setdefault(bucket_key, deque())
                 now = time.time()
 
-                # rimuovi richieste scadute
+                # rimuovi richieste e token scaduti
                 while requests and now - requests[0] > 60:
                     requests.popleft()
-
-                if len(requests) < max_requests:
+                token_sum = self.key_model_token_sum.get(bucket_key, 0)
+                while tokens and now - tokens[0][0] > 60:
+                    token_sum -= tokens.popleft()[1]
+                self.key_model_token_sum[bucket_key] = token_sum
+
+                # Somma mantenuta incrementalmente: controllo O(1) invece di sommare la finestra
+                tokens_ok = max_tokens is None or token_sum < max_tokens
+                if len(requests) < max_requests and tokens_ok:
                     # c'è spazio: registra e termina
                     requests.append(now)
                     # Incrementa contatore storico (Fix #2)
@@ -64,7 +81,10 @@ class PerKeyRateLimiter:
                     return
 
                 # calcola attesa, ma fallisce fuori dal lock
-                oldest_request = requests[0]
+                if len(requests) >= max_requests:
+                    oldest_request = requests[0]
+                else:
+                    oldest_request = tokens[0][0]
                 wait_time = 60 - (now - oldest_request) + 0.1
 
             # fuori dal lock
@@ -73,6 +93,15 @@ class PerKeyRateLimiter:
                 print(f"⏱️ Rate limit key ...{key_suffix} / {model_name}: attesa {wait_time:.1f}s")
                 time.sleep(wait_time)
             # loop di nuovo per ricalcolare e verificare di nuovo il bucket
+
+    def record_tokens(self, api_key: str, model_name: str, token_count: Optional[int]) -> None:
+        """Registra i token consumati da una richiesta (da usage_metadata) per il limite TPM."""
+        if not token_count:
+            return
+        bucket_key = f"{api_key}::{model_name}"
+        with self.lock:
+            self.key_model_tokens.setdefault(bucket_key, deque()).append((time.time(), int(token_count)))
+            self.key_model_token_sum[bucket_key] = self.key_model_token_sum.get(bucket_key, 0) + int(token_count)
     
     def get_stats(self) -> Dict[str, Dict[str, int]]:
         """Restituisce statistiche per ogni coppia key×modello"""
@@ -81,8 +110,13 @@ class PerKeyRateLimiter:
             now = time.time()
             for bucket_key, requests in self.key_model_requests.items():
                 recent = sum(1 for ts in requests if now - ts < 60)
+                recent_tokens = sum(t for ts, t in self.key_model_tokens.get(bucket_key, ()) if now - ts < 60)
                 # Usa contatore storico invece di len(requests) (Fix #2)
-                stats[bucket_key] = {"last_minute": recent, "total": self.key_model_total_count.get(bucket_key, len(requests))}
+                stats[bucket_key] = {
+                    "last_minute": recent,
+                    "tokens_last_minute": recent_tokens,
+                    "total": self.key_model_total_count.get(bucket_key, len(requests)),
+                }
             return stats
 
 
@@ -111,7 +145,12 @@ class MultiProjectManager:
             "gemini-2.5-flash-lite": 10,
             "gemini-2.5-flash": 5,
         }
-        self.rate_limiter = PerKeyRateLimiter(limits_per_model=model_limits)
+        # Limite token/minuto del free tier (i batch di più offerte possono avvicinarlo prima dell'RPM)
+        model_tpm_limits = {
+            "gemini-2.5-flash-lite": 250_000,
+            "gemini-2.5-flash": 250_000,
+        }
+        self.rate_limiter = PerKeyRateLimiter(limits_per_model=model_limits, tpm_per_model=model_tpm_limits)
     
     def get_next_key_and_model(self) -> tuple[str, str]:
         """
@@ -193,6 +232,17 @@ FALLBACK_RESULT_DLQ = {
     "match_competenze": None,
 }
 
+FALLBACK_RESULT_NOT_CACHED = {
+    "score_competenze": None,
+    "score_azienda": None,
+    "score_stipendio": None,
+    "score_località": None,
+    "score_crescita": None,
+    "score": None,
+    "motivazione": "Valutazione non presente in cache (LISTSCRAPER_LLM_CACHE=replay)",
+    "match_competenze": None,
+}
+
 
 
 def initialize_api_keys(api_keys: List[str]):
@@ -276,6 +326,52 @@ PROCESSO DI VALUTAZIONE:
 4. Nel campo match_competenze, elenca le competenze tecniche specifiche che matchano
 Rispondi in italiano, mantenendo i termini tecnici in inglese."""
 
+# Intestazioni fisse dei prompt: dopo le istruzioni di sistema formano un prefisso identico
+# tra le chiamate (caching implicito del prompt lato Gemini); le parti variabili vengono dopo
+SINGLE_PROMPT_PREFIX = (
+    "Valuta la seguente offerta di lavoro in base alle istruzioni di sistema. "
+    "Rispondi esclusivamente con JSON valido senza testo extra.\n\n"
+)
+BATCH_PROMPT_PREFIX = (
+    "Valuta separatamente ciascuna delle seguenti offerte di lavoro in base alle istruzioni di sistema. "
+    "Rispondi esclusivamente con un array JSON valido senza testo extra, con un oggetto per offerta "
+    "e il campo id uguale all'id indicato nell'intestazione dell'offerta.\n"
+)
+
+
+# Prefiltro locale: competenze e ruoli del PROFILO PROFESSIONALE / PREFERENZE (parole intere).
+# Niente "ai" da solo: in italiano è una preposizione e passerebbe quasi ogni descrizione.
+ENABLE_KEYWORD_PREFILTER = True
+PROFILE_KEYWORDS_RE = re.compile(
+    r"\b(?:python|java|pyspark|spark|hadoop|big data|data engineer(?:ing)?|data scientist|"
+    r"software engineer|backend|back-end|full[\s-]?stack|developer|sviluppatore|programmatore|"
+    r"ai engineer|genai|llm|machine learning|intelligenza artificiale|artificial intelligence|"
+    r"nlp|rag|langchain|haystack|scrapy|web scraping|mongodb|arangodb|postgres(?:ql)?|pinecone|"
+    r"sql|docker|kubernetes|fastapi|spring|rest api|ci/cd|devops|cloud|cybersecurity)\b",
+    re.IGNORECASE,
+)
+
+OFF_PROFILE_RESULT = {
+    "score_competenze": 0,
+    "score_azienda": 0,
+    "score_stipendio": 0,
+    "score_località": 0,
+    "score_crescita": 0,
+    "score": 0,
+    "motivazione": "Offerta fuori profilo: nessuna competenza o ruolo del profilo nel testo (filtro locale, non valutata dal modello)",
+    "match_competenze": [],
+}
+
+
+def _is_off_profile(row_data: Dict[str, Any]) -> bool:
+    """True se titolo, competenze e descrizione non contengono nessuna parola chiave del profilo."""
+    if not ENABLE_KEYWORD_PREFILTER:
+        return False
+    text = " ".join(
+        value for value in (row_data.get("title"), row_data.get("skills"), row_data.get("description"))
+        if isinstance(value, str)
+    )
+    return PROFILE_KEYWORDS_RE.search(text) is None
 
 
 def _enforce_competenze_zero_for_senior(
@@ -335,11 +431,42 @@ def _calculate_final_score(scores: Dict[str, int]) -> int:
     return final_score
 
 
+# Campi della riga usati nel prompt (_build_job_structured_data): gli unici estratti dal DataFrame
+PROMPT_COLUMNS = (
+    "title", "company", "location", "job_type", "job_level", "job_function", "skills",
+    "min_amount", "max_amount", "currency", "interval", "is_remote", "work_from_home_type",
+    "company_description", "company_num_employees", "company_revenue", "company_industries",
+    "company_activities", "language_requirements", "role_activities", "description",
+)
+
+# Colonne aggiunte da enrich_dataframe_with_llm
+LLM_RESULT_COLUMNS = (
+    "llm_score", "llm_score_competenze", "llm_score_azienda", "llm_score_stipendio",
+    "llm_score_località", "llm_score_crescita", "llm_motivazione", "llm_match_competenze",
+)
+
+
+# Descrizione inviata al modello troncata oltre questa lunghezza (token di input per chiamata)
+MAX_DESCRIPTION_CHARS = 4000
+
+
+def _present(value: Any) -> bool:
+    """True se il campo ha un valore da mostrare nel prompt (None, NaN e stringhe vuote esclusi)."""
+    if value is None or value is pd.NA or value is pd.NaT:
+        return False
+    if isinstance(value, float):
+        return value == value  # NaN
+    if isinstance(value, str):
+        return bool(value.strip())
+    return True
+
 
 def _build_job_structured_data(row_data: Dict[str, Any]) -> str:
     """
     Costruisce il blocco di dati strutturati per una singola offerta.
-    Questa funzione mantiene il formato originale del prompt.
+    
+    Solo i campi valorizzati: righe (e sezioni) senza dati non vengono emesse, per non pagare
+    token di input per righe "N/A"; la descrizione è troncata a MAX_DESCRIPTION_CHARS.
     
     Args:
         row_data: Dizionario con tutti i campi della job
@@ -347,68 +474,228 @@ def _build_job_structured_data(row_data: Dict[str, Any]) -> str:
     Returns:
         Stringa con dati strutturati formattati
     """
-    title = row_data.get("title")
-    company = row_data.get("company")
-    location = row_data.get("location")
-    job_type = row_data.get("job_type")
-    job_level = row_data.get("job_level")
-    job_function = row_data.get("job_function")
-    skills = row_data.get("skills")
-    min_amount = row_data.get("min_amount")
-    max_amount = row_data.get("max_amount")
-    currency = row_data.get("currency")
-    interval = row_data.get("interval")
-    is_remote = row_data.get("is_remote")
-    work_from_home_type = row_data.get("work_from_home_type")
-    company_description = row_data.get("company_description")
-    company_num_employees = row_data.get("company_num_employees")
-    company_revenue = row_data.get("company_revenue")
-    company_industries = row_data.get("company_industries")
-    company_activities = row_data.get("company_activities")
-    language_requirements = row_data.get("language_requirements")
-    role_activities = row_data.get("role_activities")
-    description = row_data.get("description")
+    get = row_data.get
+    min_amount, max_amount = get("min_amount"), get("max_amount")
+    compensation = None
+    if _present(min_amount) or _present(max_amount):
+        currency, interval = get("currency"), get("interval")
+        compensation = (
+            f"{min_amount if _present(min_amount) else 'N/A'} - {max_amount if _present(max_amount) else 'N/A'}"
+            f" {currency if _present(currency) else ''} ({interval if _present(interval) else 'N/A'})"
+        )
+
+    sections = (
+        ("IDENTIFICAZIONE", (
+            ("Titolo", get("title")),
+            ("Azienda", get("company")),
+            ("Posizione", get("location")),
+        )),
+        ("RUOLO E SENIORITY", (
+            ("Tipo di contratto", get("job_type")),
+            ("Livello", get("job_level")),
+            ("Funzione", get("job_function")),
+            ("Competenze richieste", get("skills")),
+            ("Attività ruolo", get("role_activities")),
+            ("Lingue", get("language_requirements")),
+        )),
+        ("COMPENSO", (
+            ("Range", compensation),
+        )),
+        ("MODALITÀ LAVORO", (
+            ("Remoto", get("is_remote")),
+            ("Tipo lavoro", get("work_from_home_type")),
+        )),
+        ("AZIENDA", (
+            ("Descrizione", get("company_description")),
+            ("Dipendenti", get("company_num_employees")),
+            ("Fatturato", get("company_revenue")),
+            ("Settori", get("company_industries")),
+            ("Attività", get("company_activities")),
+        )),
+    )
+
+    blocks = ["OFFERTA DI LAVORO - DATI STRUTTURATI:"]
+    for header, fields in sections:
+        lines = [f"- {label}: {value}" for label, value in fields if _present(value)]
+        if lines:
+            blocks.append(f"{header}:\n" + "\n".join(lines))
+
+    description = get("description")
+    if isinstance(description, str) and len(description) > MAX_DESCRIPTION_CHARS:
+        description = description[:MAX_DESCRIPTION_CHARS] + "…"
+    blocks.append(f"DESCRIZIONE COMPLETA:\n{description}")
+    return "\n" + "\n\n".join(blocks) + "\n"
+
+
+
+def _build_evaluation_schema(with_id: bool = False) -> genai_types.Schema:
+    """
+    Schema JSON della valutazione di una singola offerta.
+    
+    Args:
+        with_id: aggiunge il campo obbligatorio "id" (usato per allineare le risposte batch)
+    """
+    score_fields = ["score_competenze", "score_azienda", "score_stipendio", "score_località", "score_crescita"]
+    properties = {
+        field: genai_types.Schema(type=genai_types.Type.INTEGER, minimum=0, maximum=10)
+        for field in score_fields
+    }
+    properties.update({
+        "motivazione": genai_types.Schema(
+            type=genai_types.Type.STRING,
+        ),
+        "match_competenze": genai_types.Schema(
+            type=genai_types.Type.ARRAY,
+            items=genai_types.Schema(
+                type=genai_types.Type.STRING,
+            ),
+        ),
+    })
+    required = score_fields + ["motivazione", "match_competenze"]
+    if with_id:
+        properties = {"id": genai_types.Schema(type=genai_types.Type.STRING), **properties}
+        required = ["id"] + required
+    return genai_types.Schema(type=genai_types.Type.OBJECT, required=required, properties=properties)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_client(api_key: str) -> genai.Client:
+    """Client Gemini per API key, creato una sola volta e condiviso tra i thread (riusa le connessioni)."""
+    return genai.Client(api_key=api_key)
+
+
+@functools.lru_cache(maxsize=None)
+def _generation_config(batch: bool = False) -> genai_types.GenerateContentConfig:
+    """
+    Configurazione della chiamata (schema di risposta incluso), costruita una sola volta:
+    è identica per tutte le chiamate dello stesso tipo, cambiano solo i contenuti.
     
-    return f"""
-OFFERTA DI LAVORO - DATI STRUTTURATI:
+    Args:
+        batch: risposta array di valutazioni con "id" (evaluate_jobs_batch) invece di una singola
+    """
+    response_schema = _build_evaluation_schema(with_id=batch)
+    if batch:
+        response_schema = genai_types.Schema(type=genai_types.Type.ARRAY, items=response_schema)
+    return genai_types.GenerateContentConfig(
+        temperature=0.2,
+        thinking_config=genai_types.ThinkingConfig(thinking_budget=0),
+        response_mime_type="application/json",
+        response_schema=response_schema,
+        system_instruction=[
+            genai_types.Part.from_text(text=SYSTEM_INSTRUCTIONS),
+        ],
+    )
+
 
+def _generate_json_text(api_key: str, model_name: str, prompt: str, config: genai_types.GenerateContentConfig) -> str:
+    """Esegue una chiamata Gemini con output JSON vincolato allo schema della configurazione e restituisce il testo."""
+    client = _get_client(api_key)
+    contents = [
+        genai_types.Content(
+            role="user",
+            parts=[
+                genai_types.Part.from_text(text=prompt),
+            ],
+        )
+    ]
+    # Risposta JSON usata solo per intero: niente streaming (nessun vantaggio, solo overhead per chunk)
+    response = client.models.generate_content(
+        model=model_name,
+        contents=contents,
+        config=config,
+    )
+    usage = getattr(response, "usage_metadata", None)
+    if _project_manager and usage is not None:
+        _project_manager.rate_limiter.record_tokens(api_key, model_name, getattr(usage, "total_token_count", None))
+    text = (response.text or "").strip()
+    if not text:
+        raise ValueError(
+            "Risposta API vuota (possibile safety block, timeout o contenuto filtrato)"
+        )
+    return text
 
-IDENTIFICAZIONE:
-- Titolo: {title or 'N/A'}
-- Azienda: {company or 'N/A'}
-- Posizione: {location or 'N/A'}
 
+def _parse_evaluation(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte la risposta JSON del modello nel dizionario risultato (con score finale)."""
+    scores = {
+        "score_competenze": int(parsed.get("score_competenze", 0)),
+        "score_azienda": int(parsed.get("score_azienda", 0)),
+        "score_stipendio": int(parsed.get("score_stipendio", 0)),
+        "score_località": int(parsed.get("score_località", 0)),
+        "score_crescita": int(parsed.get("score_crescita", 0)),
+    }
 
-RUOLO E SENIORITY:
-- Tipo di contratto: {job_type or 'N/A'}
-- Livello: {job_level or 'N/A'}
-- Funzione: {job_function or 'N/A'}
-- Competenze richieste: {skills or 'N/A'}
-- Attività ruolo: {role_activities or 'N/A'}
-- Lingue: {language_requirements or 'N/A'}
+    motivazione = str(parsed.get("motivazione", ""))
+    # Applica la regola: se la motivazione indica mid/senior, score_competenze deve essere 0
+    _enforce_competenze_zero_for_senior(scores, motivazione=motivazione)
+    
+    final_score = _calculate_final_score(scores)
+    
+    return {
+        "score_competenze": scores["score_competenze"],
+        "score_azienda": scores["score_azienda"],
+        "score_stipendio": scores["score_stipendio"],
+        "score_località": scores["score_località"],
+        "score_crescita": scores["score_crescita"],
+        "score": final_score,
+        "motivazione": motivazione,
+        "match_competenze": list(parsed.get("match_competenze", []) or []),
+    }
 
 
-COMPENSO:
-- Range: {min_amount or 'N/A'} - {max_amount or 'N/A'} {currency or ''} ({interval or 'N/A'})
 
+# Separatori, punteggiatura e markup ignorati nel confronto tra offerte ripubblicate
+_NON_WORD_RE = re.compile(r"[\W_]+")
 
-MODALITÀ LAVORO:
-- Remoto: {is_remote if is_remote is not None else 'N/A'}
-- Tipo lavoro: {work_from_home_type or 'N/A'}
 
+def _near_duplicate_text(value: Any) -> str:
+    """Valore normalizzato (minuscolo, solo parole) per riconoscere le ripubblicazioni."""
+    if not _present(value):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # 30000.0 e 30000 sono lo stesso importo
+    return _NON_WORD_RE.sub(" ", str(value).lower()).strip()
 
-AZIENDA:
-- Descrizione: {company_description or 'N/A'}
-- Dipendenti: {company_num_employees or 'N/A'}
-- Fatturato: {company_revenue or 'N/A'}
-- Settori: {company_industries or 'N/A'}
-- Attività: {company_activities or 'N/A'}
 
+# Campi che distinguono due offerte nel tier "quasi duplicato": tutti quelli che incidono sul
+# punteggio (località, contratto, compenso, modalità di lavoro), non solo il testo dell'annuncio
+NEAR_DUPLICATE_FIELDS = (
+    "company", "title", "location", "job_type", "is_remote", "work_from_home_type",
+    "interval", "min_amount", "max_amount", "currency", "description",
+)
 
-DESCRIZIONE COMPLETA:
-{description}
-"""
 
+def _near_duplicate_fields(row_data: Dict[str, Any]) -> tuple[str, ...]:
+    """Campi normalizzati dell'offerta: uguali solo se l'offerta differisce per la sola formattazione."""
+    return tuple(_near_duplicate_text(row_data.get(field)) for field in NEAR_DUPLICATE_FIELDS)
+
+
+def _evaluation_cache_keys(row_data: Dict[str, Any], structured_data: str) -> tuple[str, str]:
+    """
+    Chiavi di cache della valutazione, in ordine di lookup (cambiano se cambiano le istruzioni di sistema):
+    - match esatto sui dati strutturati dell'offerta
+    - quasi duplicato: stessi NEAR_DUPLICATE_FIELDS a meno di maiuscole, punteggiatura e spaziatura
+      (offerta ripubblicata con soli ritocchi di formattazione; una località, un contratto o un
+      compenso diversi danno una chiave diversa)
+    """
+    return (
+        make_cache_key(SYSTEM_INSTRUCTIONS, structured_data),
+        make_cache_key(SYSTEM_INSTRUCTIONS, "near-duplicate", *_near_duplicate_fields(row_data)),
+    )
+
+
+def _get_cached_evaluation(cache: LLMResultCache, keys: tuple[str, ...]) -> Optional[Dict[str, Any]]:
+    """Prima risposta in cache tra le chiavi (None se nessuna)."""
+    for key in keys:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    return None
+
+
+def _set_cached_evaluation(cache: LLMResultCache, keys: tuple[str, ...], value: Dict[str, Any]) -> None:
+    for key in keys:
+        cache.set(key, value)
 
 
 def evaluate_job(row_data: Dict[str, Any], max_retries: int = 3, base_delay: float = 1.5) -> Dict[str, Any]:
@@ -439,15 +726,23 @@ def evaluate_job(row_data: Dict[str, Any], max_retries: int = 3, base_delay: flo
             "match_competenze": [],
         }
 
+    # Offerta chiaramente fuori profilo (nessuna competenza/ruolo del profilo nel testo): niente chiamata API
+    if _is_off_profile(row_data):
+        return OFF_PROFILE_RESULT.copy()
+
     # Usa la funzione helper per costruire i dati strutturati
     structured_data = _build_job_structured_data(row_data)
 
-    # Prompt originale invariato
-    prompt = (
-        "Valuta la seguente offerta di lavoro in base alle istruzioni di sistema. "
-        "Rispondi esclusivamente con JSON valido senza testo extra.\n\n"
-        + structured_data
-    )
+    # Stessa offerta già valutata (altro sito o esecuzione precedente): nessuna chiamata API
+    cache = get_llm_cache()
+    cache_keys = _evaluation_cache_keys(row_data, structured_data)
+    cached = _get_cached_evaluation(cache, cache_keys)
+    if cached is not None:
+        return _parse_evaluation(cached)
+    if cache.replay:
+        return FALLBACK_RESULT_NOT_CACHED.copy()
+
+    prompt = SINGLE_PROMPT_PREFIX + structured_data
 
     last_err: Optional[Exception] = None
     current_key: str = ""
@@ -463,109 +758,12 @@ def evaluate_job(row_data: Dict[str, Any], max_retries: int = 3, base_delay: flo
             if attempt == 1 or not current_key:
                 current_key, model_name = _project_manager.get_next_key_and_model()
 
-            client = genai.Client(api_key=current_key)
-
-            response_schema = genai_types.Schema(
-                type=genai_types.Type.OBJECT,
-                required=["score_competenze", "score_azienda", "score_stipendio", 
-                         "score_località", "score_crescita", 
-                         "motivazione", "match_competenze"],
-                properties={
-                    "score_competenze": genai_types.Schema(
-                        type=genai_types.Type.INTEGER,
-                        minimum=0,
-                        maximum=10,
-                    ),
-                    "score_azienda": genai_types.Schema(
-                        type=genai_types.Type.INTEGER,
-                        minimum=0,
-                        maximum=10,
-                    ),
-                    "score_stipendio": genai_types.Schema(
-                        type=genai_types.Type.INTEGER,
-                        minimum=0,
-                        maximum=10,
-                    ),
-                    "score_località": genai_types.Schema(
-                        type=genai_types.Type.INTEGER,
-                        minimum=0,
-                        maximum=10,
-                    ),
-                    "score_crescita": genai_types.Schema(
-                        type=genai_types.Type.INTEGER,
-                        minimum=0,
-                        maximum=10,
-                    ),
-                    "motivazione": genai_types.Schema(
-                        type=genai_types.Type.STRING,
-                    ),
-                    "match_competenze": genai_types.Schema(
-                        type=genai_types.Type.ARRAY,
-                        items=genai_types.Schema(
-                            type=genai_types.Type.STRING,
-                        ),
-                    ),
-                },
-            )
-
-            contents = [
-                genai_types.Content(
-                    role="user",
-                    parts=[
-                        genai_types.Part.from_text(text=prompt),
-                    ],
-                )
-            ]
-            cfg = genai_types.GenerateContentConfig(
-                temperature=0.2,
-                thinking_config=genai_types.ThinkingConfig(thinking_budget=0),
-                response_mime_type="application/json",
-                response_schema=response_schema,
-                system_instruction=[
-                    genai_types.Part.from_text(text=SYSTEM_INSTRUCTIONS),
-                ],
-            )
-            stream = client.models.generate_content_stream(
-                model=model_name,
-                contents=contents,
-                config=cfg,
-            )
-            accum = []
-            for chunk in stream:
-                if getattr(chunk, "text", None):
-                    accum.append(chunk.text)
-            text = ("".join(accum)).strip()
-            if not text:
-                raise ValueError(
-                    "Risposta API vuota (possibile safety block, timeout o contenuto filtrato)"
-                )
-            json_str = _extract_json(text)
-            parsed = json.loads(json_str)
+            text = _generate_json_text(current_key, model_name, prompt, _generation_config())
+            # Output vincolato da response_mime_type + response_schema: JSON diretto, niente recupero da testo libero
+            parsed = orjson.loads(text)
             
-            scores = {
-                "score_competenze": int(parsed.get("score_competenze", 0)),
-                "score_azienda": int(parsed.get("score_azienda", 0)),
-                "score_stipendio": int(parsed.get("score_stipendio", 0)),
-                "score_località": int(parsed.get("score_località", 0)),
-                "score_crescita": int(parsed.get("score_crescita", 0)),
-            }
-
-            motivazione = str(parsed.get("motivazione", ""))
-            # Applica la regola: se la motivazione indica mid/senior, score_competenze deve essere 0
-            _enforce_competenze_zero_for_senior(scores, motivazione=motivazione)
-            
-            final_score = _calculate_final_score(scores)
-            
-            result = {
-                "score_competenze": scores["score_competenze"],
-                "score_azienda": scores["score_azienda"],
-                "score_stipendio": scores["score_stipendio"],
-                "score_località": scores["score_località"],
-                "score_crescita": scores["score_crescita"],
-                "score": final_score,
-                "motivazione": motivazione,
-                "match_competenze": list(parsed.get("match_competenze", []) or []),
-            }
+            result = _parse_evaluation(parsed)
+            _set_cached_evaluation(cache, cache_keys, parsed)
             return result
             
         except Exception as e:
@@ -638,6 +836,72 @@ def evaluate_job(row_data: Dict[str, Any], max_retries: int = 3, base_delay: flo
 
 
 
+def evaluate_jobs_batch(rows_data: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """
+    Valuta più offerte con una sola richiesta (prompt con K offerte, risposta array JSON).
+    
+    Ogni offerta è etichettata con la sua posizione nel batch e la risposta viene riallineata
+    tramite il campo "id"; le offerte già in cache non vengono inviate. Nessun retry qui: le offerte senza risultato valido (errore API,
+    JSON non valido, id mancanti) vanno rivalutate singolarmente con `evaluate_job`.
+    
+    Args:
+        rows_data: Lista di dizionari con i campi delle righe (tutte con descrizione)
+        
+    Returns:
+        Dizionario posizione nel batch → risultato, solo per le offerte valutate con successo
+        (o trovate in cache)
+    """
+    if not _project_manager:
+        raise RuntimeError("Project manager non inizializzato")
+
+    structured = [_build_job_structured_data(row_data) for row_data in rows_data]
+    # Offerte già in cache risolte subito: al modello vanno solo quelle mancanti
+    cache = get_llm_cache()
+    results: Dict[int, Dict[str, Any]] = {}
+    cache_keys = [_evaluation_cache_keys(row_data, structured_data) for row_data, structured_data in zip(rows_data, structured)]
+    pending: List[int] = []
+    for pos, keys in enumerate(cache_keys):
+        cached = _get_cached_evaluation(cache, keys)
+        if cached is not None:
+            results[pos] = _parse_evaluation(cached)
+        else:
+            pending.append(pos)
+    # Una sola offerta mancante: la valuta evaluate_job (con retry), non serve una richiesta batch;
+    # in replay le mancanti non vanno al modello (evaluate_job restituisce il fallback)
+    if len(pending) < 2 or cache.replay:
+        return results
+
+    offers = "\n".join(
+        f"=== OFFERTA id={pos} ===\n{structured[pos]}"
+        for pos in pending
+    )
+    # Numero di offerte dopo il prefisso fisso: non spezza il prefisso comune tra batch di dimensioni diverse
+    prompt = BATCH_PROMPT_PREFIX + f"Numero di offerte: {len(pending)}\n\n" + offers
+
+    current_key, model_name = _project_manager.get_next_key_and_model()
+    try:
+        text = _generate_json_text(current_key, model_name, prompt, _generation_config(batch=True))
+        parsed = orjson.loads(text)
+    except Exception as e:
+        print(f"⚠️ LLM batch {type(e).__name__}: {len(pending)} job rivalutati singolarmente")
+        if _is_rpd_error(str(e)):
+            with _rpd_exhausted_lock:
+                _rpd_exhausted_slots.add(f"{current_key}::{model_name}")
+        return results
+
+    pending_set = set(pending)
+    for item in parsed if isinstance(parsed, list) else []:
+        try:
+            pos = int(item["id"])
+            if pos in pending_set and pos not in results:
+                results[pos] = _parse_evaluation(item)
+                # In cache senza l'id di posizione (dipende dal batch, non dall'offerta)
+                _set_cached_evaluation(cache, cache_keys[pos], {k: v for k, v in item.items() if k != "id"})
+        except Exception:
+            continue  # Elemento non valido: l'offerta verrà rivalutata singolarmente
+    return results
+
+
 def _get_retry_seconds_from_error(e: Exception) -> Optional[float]:
     """
     Estrae il delay di retry suggerito dall'errore API (es. 429 con 'Please retry in 59s').
@@ -684,74 +948,66 @@ def _is_rpd_error(error_message: str) -> bool:
     return any(kw in msg for kw in rpd_keywords)
 
 
-def _extract_json(text: str) -> str:
-    """Estrae JSON robusto anche con testo extra"""
-    text = text.strip()
-
-    # Caso 1: JSON pulito
-    if text.startswith("{") and text.endswith("}"):
-        try:
-            json.loads(text)
-            return text
-        except json.JSONDecodeError:
-            pass  # Fallback ai metodi successivi
-
-    # Caso 2: JSON con testo extra DOPO
-    # "{ ... } \n\nAlcune note extra..."
-    start = text.find("{")
-    if start == -1:
-        return "{}"
-
-    # Trova la chiusura bilanciata
-    depth = 0
-    for i in range(start, len(text)):
-        if text[i] == "{":
-            depth += 1
-        elif text[i] == "}":
-            depth -= 1
-            if depth == 0:
-                candidate = text[start : i + 1]
-                try:
-                    json.loads(candidate)
-                    return candidate
-                except json.JSONDecodeError:
-                    continue  # Prova la prossima }
-
-    # Caso 3: JSON con testo extra PRIMA
-    # "Ecco la valutazione: { ... }"
-    end = text.rfind("}")
-    if end != -1 and end > start:
-        candidate = text[start : end + 1]
-        try:
-            json.loads(candidate)
-            return candidate
-        except json.JSONDecodeError:
-            pass
-
-    # Caso 4: Multiple JSON objects (prendi il primo completo)
-    json_pattern = r"\{(?:[^{}]|(?:\{(?:[^{}]|(?:\{[^{}]*\})*)*\}))*\}"
-    matches = re.findall(json_pattern, text, re.DOTALL)
-
-    for match in matches:
-        try:
-            parsed = json.loads(match)
-            # Per il singolo job, cerca i campi attesi
-            if "score_competenze" in parsed:
-                return match
-        except json.JSONDecodeError:
-            continue
-
-    # Fallback finale
-    return "{}"
-
-
-
-def enrich_dataframe_with_llm(df: pd.DataFrame) -> pd.DataFrame:
+def _evaluate_chunk(chunk: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
     """
-    Arricchisce DataFrame con valutazioni LLM processando job singolarmente.
+    Valuta un gruppo di righe (una richiesta batch + eventuali rivalutazioni singole).
+    
+    Returns:
+        Dizionario posizione nel gruppo → risultato, per tutte le righe
+    """
+    # Early termination: se tutti gli slot RPD sono esauriti, usa direttamente il fallback
+    threshold = _get_rpd_exhaustion_threshold()
+    with _rpd_exhausted_lock:
+        use_fallback = len(_rpd_exhausted_slots) >= threshold
+
+    if use_fallback:
+        print(f"   [RPD] Soglia {threshold} raggiunta. {len(chunk)} job skippati con fallback.")
+        return {pos: FALLBACK_RESULT_RPD.copy() for pos in range(len(chunk))}
+
+    chunk_results: Dict[int, Dict[str, Any]] = {}
+    # Solo i job con descrizione e nel profilo vanno al modello; gli altri sono risolti da evaluate_job senza chiamate
+    to_batch = [
+        pos for pos, record in enumerate(chunk)
+        if isinstance(record.get("description"), str) and record.get("description").strip()
+        and not _is_off_profile(record)
+    ]
+    if len(to_batch) > 1:
+        batch_results = evaluate_jobs_batch([chunk[pos] for pos in to_batch])
+        chunk_results = {to_batch[i]: res for i, res in batch_results.items()}
+    for pos, record in enumerate(chunk):
+        if pos not in chunk_results:
+            chunk_results[pos] = evaluate_job(record, max_retries=len(GEMINI_API_KEYS) * 2)
+    return chunk_results
+
+
+async def _evaluate_chunks_concurrently(
+    chunks: List[List[Dict[str, Any]]],
+    max_inflight: int,
+    progress_bar: tqdm,
+) -> List[Dict[int, Dict[str, Any]]]:
+    """Valuta i gruppi con al massimo `max_inflight` richieste in volo; risultati nell'ordine dei gruppi."""
+    semaphore = asyncio.BoundedSemaphore(max_inflight)
+
+    async def run(chunk: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        async with semaphore:
+            results = await asyncio.to_thread(_evaluate_chunk, chunk)
+        progress_bar.update(len(chunk))
+        return results
+
+    return await asyncio.gather(*(run(chunk) for chunk in chunks))
+
+
+def enrich_dataframe_with_llm(df: pd.DataFrame, batch_size: int = 8, reset_rpd: bool = True, max_inflight: int = 4) -> pd.DataFrame:
+    """
+    Arricchisce DataFrame con valutazioni LLM, raggruppando più job per richiesta.
     
     Args:
         df: DataFrame con job descriptions
+        batch_size: job valutati in una sola richiesta (1 = una richiesta per job);
+            i job senza risultato valido nel batch vengono rivalutati singolarmente
+        reset_rpd: azzera gli slot RPD esauriti (False quando la stessa esecuzione
+            arricchisce più lotti in sequenza)
+        max_inflight: richieste al modello in volo contemporaneamente
     
     Returns:
         DataFrame arricchito con colonne llm_*
@@ -761,33 +1017,36 @@ def enrich_dataframe_with_llm(df: pd.DataFrame) -> pd.DataFrame:
 
     # Reset del contatore RPD all'inizio di ogni esecuzione per evitare stato sporco
     global _rpd_exhausted_slots
-    with _rpd_exhausted_lock:
-        _rpd_exhausted_slots.clear()
     threshold = _get_rpd_exhaustion_threshold()
-    if threshold > 0:
-        print(f"🔄 Reset contatore RPD. Slot key×modello disponibili: {threshold}")
-
-    new_cols = {
-        "llm_score": [],
-        "llm_score_competenze": [],
-        "llm_score_azienda": [],
-        "llm_score_stipendio": [],
-        "llm_score_località": [],
-        "llm_score_crescita": [],
-        "llm_motivazione": [],
-        "llm_match_competenze": [],
-    }
-
-    dlq: list[tuple[int, Any]] = []  # (DataFrame index, row)
+    if reset_rpd:
+        with _rpd_exhausted_lock:
+            _rpd_exhausted_slots.clear()
+        if threshold > 0:
+            print(f"🔄 Reset contatore RPD. Slot key×modello disponibili: {threshold}")
 
     total_rows = len(df)
+    # Liste preallocate, riempite per posizione
+    new_cols = {col: [None] * total_rows for col in LLM_RESULT_COLUMNS}
+
+    dlq: list[tuple[Any, Dict[str, Any]]] = []  # (DataFrame index, record)
+
+    batch_size = max(1, batch_size)
+
+    # Dizionari semplici (solo i campi del prompt) invece di una Series per riga con iterrows
+    records = df[[col for col in PROMPT_COLUMNS if col in df.columns]].to_dict("records")
+    # Offerte identiche (es. da più siti) valutate una sola volta: ogni riga punta alla prima
+    # occorrenza, il risultato viene poi copiato sulle altre. Stessa chiave normalizzata del tier
+    # "quasi duplicato" della cache: località e compenso diversi restano valutazioni separate
+    first_seen: Dict[tuple, int] = {}
+    source = [first_seen.setdefault(_near_duplicate_fields(record), i) for i, record in enumerate(records)]
+    unique_positions = list(first_seen.values())
+    unique_records = [records[i] for i in unique_positions]
     
-    print(f"\n=== ELABORAZIONE LLM SINGOLA ===")
-    print(f"Elaborazione di {total_rows} offerte di lavoro (1 per richiesta)...")
+    print(f"\n=== ELABORAZIONE LLM ===")
+    print(f"Elaborazione di {total_rows} offerte di lavoro ({len(unique_records)} distinte, {batch_size} per richiesta)...")
     
     progress_bar = tqdm(
-        df.iterrows(), 
-        total=total_rows,
+        total=len(unique_records),
         ncols=100,
         desc="Elaborazione LLM",
         unit="job",
@@ -795,46 +1054,42 @@ def enrich_dataframe_with_llm(df: pd.DataFrame) -> pd.DataFrame:
         bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]"
     )
 
-    for idx, row in progress_bar:
-        # Early termination: se tutti gli slot RPD sono esauriti, usa direttamente il fallback
-        with _rpd_exhausted_lock:
-            use_fallback = len(_rpd_exhausted_slots) >= _get_rpd_exhaustion_threshold()
+    chunks = [unique_records[start:start + batch_size] for start in range(0, len(unique_records), batch_size)]
+    # Richieste in volo in parallelo (thread); il rate limiter per key/modello resta il limite effettivo
+    all_results = asyncio.run(_evaluate_chunks_concurrently(chunks, max_inflight, progress_bar))
 
-        if use_fallback:
-            print(f"   [RPD] Soglia {threshold} raggiunta. Job {idx} skippato con fallback.")
-            res = FALLBACK_RESULT_RPD.copy()
-        else:
-            res = evaluate_job(row.to_dict(), max_retries=len(GEMINI_API_KEYS) * 2)
+    results_by_position: Dict[int, Dict[str, Any]] = {}
+    for chunk_no, chunk_results in enumerate(all_results):
+        start = chunk_no * batch_size
+        for pos, res in chunk_results.items():
+            results_by_position[unique_positions[start + pos]] = res
 
+    for i in range(total_rows):
+        res = results_by_position[source[i]]
         if res.get("motivazione", "").startswith("DLQ:"):
-            dlq.append((idx, row))
-            new_cols["llm_score"].append(None)
-            new_cols["llm_score_competenze"].append(None)
-            new_cols["llm_score_azienda"].append(None)
-            new_cols["llm_score_stipendio"].append(None)
-            new_cols["llm_score_località"].append(None)
-            new_cols["llm_score_crescita"].append(None)
-            new_cols["llm_motivazione"].append("DLQ: in attesa di riprocessamento")
-            new_cols["llm_match_competenze"].append(None)
+            dlq.append((df.index[i], records[i]))
+            new_cols["llm_motivazione"][i] = "DLQ: in attesa di riprocessamento"
         else:
-            new_cols["llm_score"].append(res.get("score"))
-            new_cols["llm_score_competenze"].append(res.get("score_competenze"))
-            new_cols["llm_score_azienda"].append(res.get("score_azienda"))
-            new_cols["llm_score_stipendio"].append(res.get("score_stipendio"))
-            new_cols["llm_score_località"].append(res.get("score_località"))
-            new_cols["llm_score_crescita"].append(res.get("score_crescita"))
-            new_cols["llm_motivazione"].append(res.get("motivazione", ""))
+            new_cols["llm_score"][i] = res.get("score")
+            new_cols["llm_score_competenze"][i] = res.get("score_competenze")
+            new_cols["llm_score_azienda"][i] = res.get("score_azienda")
+            new_cols["llm_score_stipendio"][i] = res.get("score_stipendio")
+            new_cols["llm_score_località"][i] = res.get("score_località")
+            new_cols["llm_score_crescita"][i] = res.get("score_crescita")
+            new_cols["llm_motivazione"][i] = res.get("motivazione", "")
             
             match_comp = res.get("match_competenze")
-            new_cols["llm_match_competenze"].append(
-                json.dumps(match_comp, ensure_ascii=False) if match_comp is not None else None
-            )
+            if match_comp is not None:
+                new_cols["llm_match_competenze"][i] = orjson.dumps(match_comp).decode()
 
     progress_bar.close()
     
-    # Applica new_cols PRIMA del DLQ processing (Bug #1 fix)
-    for k, v in new_cols.items():
-        df[k] = v
+    # Applica new_cols PRIMA del DLQ processing (Bug #1 fix): un solo DataFrame risultato e un
+    # solo concat al posto di un'assegnazione per colonna; le colonne llm_* già presenti nello
+    # schema vengono sostituite mantenendo la loro posizione
+    results_df = pd.DataFrame(new_cols, index=df.index)
+    columns = list(df.columns) + [col for col in LLM_RESULT_COLUMNS if col not in df.columns]
+    df = pd.concat([df.drop(columns=[col for col in LLM_RESULT_COLUMNS if col in df.columns]), results_df], axis=1)[columns]
     
     if dlq:
         cooldown = 60
@@ -847,9 +1102,9 @@ def enrich_dataframe_with_llm(df: pd.DataFrame) -> pd.DataFrame:
         
         print(f"♻️ Inizio riprocessamento DLQ...")
 
-        for dlq_idx, (df_idx, row) in enumerate(dlq, start=1):
+        for dlq_idx, (df_idx, record) in enumerate(dlq, start=1):
             print(f"  DLQ job {dlq_idx}/{len(dlq)}...")
-            res = evaluate_job(row.to_dict(), max_retries=len(GEMINI_API_KEYS) * len(SINGLE_EVAL_MODELS))
+            res = evaluate_job(record, max_retries=len(GEMINI_API_KEYS) * len(SINGLE_EVAL_MODELS))
             # log esplicito per DLQ falliti definitivamente
             motiv = res.get("motivazione", "")
             if motiv.startswith("DLQ:") or motiv.startswith("Quota RPD"):
@@ -864,7 +1119,7 @@ def enrich_dataframe_with_llm(df: pd.DataFrame) -> pd.DataFrame:
             df.at[df_idx, "llm_score_crescita"]   = res.get("score_crescita")
             df.at[df_idx, "llm_motivazione"]      = res.get("motivazione")
             df.at[df_idx, "llm_match_competenze"] = (
-                json.dumps(res.get("match_competenze"), ensure_ascii=False)
+                orjson.dumps(res.get("match_competenze")).decode()
                 if res.get("match_competenze") is not None else None
             )
 
@@ -0,0 +1,138 @@
+"""
+Cache delle valutazioni LLM (match esatto): LRU in memoria + tabella SQLite su disco.
+
+La chiave è lo SHA-256 di istruzioni di sistema + dati strutturati dell'offerta: la stessa
+offerta ripubblicata su più siti o rivista in esecuzioni successive non costa una nuova
+chiamata a Gemini finché istruzioni e contenuto restano identici.
+
+Configurazione:
+- Env var LISTSCRAPER_LLM_CACHE: politica della cache (default: enabled)
+    - enabled: legge e scrive
+    - read-only: legge, non salva nuove valutazioni
+    - write-only: non legge (rivaluta tutto), salva le nuove valutazioni
+    - replay: solo cache, nessuna chiamata API (le offerte non in cache restano senza valutazione)
+    - disabled: nessuna lettura né scrittura
+- Env var LISTSCRAPER_LLM_CACHE_DB: percorso del database (default: storage/llm_cache.db)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Optional
+
+import orjson
+
+
+# Database della cache accanto a quello dei job (storage/), non versionato
+DEFAULT_CACHE_DB = str(Path(__file__).resolve().parent.parent / "storage" / "llm_cache.db")
+CACHE_POLICIES = ("enabled", "read-only", "write-only", "replay", "disabled")
+DEFAULT_MAXSIZE = 2048
+DEFAULT_TTL_DAYS = 30
+
+
+def make_cache_key(*parts: str) -> str:
+    """Chiave deterministica per le parti del prompt (SHA-256 esadecimale)."""
+    return hashlib.sha256(orjson.dumps(parts)).hexdigest()
+
+
+class LLMResultCache:
+    """Cache a due livelli (LRU in memoria → SQLite) delle risposte JSON del modello, thread-safe."""
+
+    def __init__(self, db_path: str = DEFAULT_CACHE_DB, maxsize: int = DEFAULT_MAXSIZE, ttl_days: int = DEFAULT_TTL_DAYS, policy: str = "enabled"):
+        if policy not in CACHE_POLICIES:
+            raise ValueError(f"Politica cache LLM non valida: {policy} (ammesse: {', '.join(CACHE_POLICIES)})")
+        self.db_path = db_path
+        self.policy = policy
+        self.readable = policy in ("enabled", "read-only", "replay")
+        self.writable = policy in ("enabled", "write-only")
+        # In replay le offerte non in cache non vanno al modello
+        self.replay = policy == "replay"
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_days * 86400
+        self._memory: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.lock = Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connessione SQLite aperta al primo uso (condivisa tra thread, protetta dal lock)."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            conn.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, json TEXT NOT NULL, ts INTEGER NOT NULL)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Risposta in cache per la chiave (None se assente, scaduta o lettura disabilitata)."""
+        if not self.readable:
+            return None
+        with self.lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                return value
+            try:
+                row = self._connection().execute(
+                    "SELECT json FROM llm_cache WHERE key = ? AND ts >= ?",
+                    (key, int(time.time()) - self.ttl_seconds),
+                ).fetchone()
+            except sqlite3.Error:
+                return None  # La cache non deve mai bloccare la valutazione
+            if row is None:
+                return None
+            value = orjson.loads(row[0])
+            self._remember(key, value)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Salva la risposta in memoria e su disco (se la politica lo consente)."""
+        if not self.writable:
+            return
+        with self.lock:
+            self._remember(key, value)
+            try:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, json, ts) VALUES (?, ?, ?)",
+                    (key, orjson.dumps(value).decode(), int(time.time())),
+                )
+                conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def close(self) -> None:
+        with self.lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_cache: Optional[LLMResultCache] = None
+_cache_lock = Lock()
+
+
+def get_llm_cache() -> LLMResultCache:
+    """Istanza condivisa della cache (creata al primo uso)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResultCache(
+                db_path=os.getenv("LISTSCRAPER_LLM_CACHE_DB", DEFAULT_CACHE_DB),
+                policy=os.getenv("LISTSCRAPER_LLM_CACHE", "enabled").strip().lower(),
+            )
+        return _cache
@@ -2,11 +2,46 @@
 Utility functions comuni per tutti gli scraper
 """
 
+import numpy as np
 import pandas as pd
 import re
 from html import unescape
 
 
+# Pattern compilati una sola volta (clean_html_text è chiamata per ogni descrizione)
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+# Schema fisso definito a priori (costante: lo schema non cambia a runtime)
+FIXED_SCHEMA: tuple[str, ...] = (
+    # Identificatori
+    'id', 'site', 'job_url', 'job_url_direct', 'title', 'company',
+    
+    # Posizione e tempo
+    'location', 'date_posted', 'job_type', 'is_remote', 'work_from_home_type',
+    
+    # Compenso
+    'interval', 'min_amount', 'max_amount', 'currency',
+    
+    # Ruolo e competenze
+    'job_level', 'job_function', 'skills', 'description',
+    
+    # Azienda
+    'company_url', 'company_logo', 'company_num_employees', 'company_revenue', 
+    'company_description', 'company_industries', 'company_activities',
+    
+    # Campi aggiuntivi HiringCafe
+    'language_requirements', 'role_activities',
+    
+    # Colonne arricchimento LLM
+    'llm_score', 'llm_motivazione', 'llm_match_competenze',
+    
+    # Data di scraping
+    'scraping_date',
+)
+
+
 def clean_html_text(text: str) -> str:
     """
     Rimuove tutti i tag HTML e CSS dalle descrizioni dei lavori, mantenendo solo il testo pulito.
@@ -20,29 +55,36 @@ def clean_html_text(text: str) -> str:
     if not text or not isinstance(text, str):
         return text
     
-    # Decodifica le entità HTML (es. &amp; -> &, &lt; -> <)
-    text = unescape(text)
+    # Decodifica le entità HTML (es. &amp; -> &, &lt; -> <): solo se il testo ne contiene
+    if '&' in text:
+        text = unescape(text)
     
     # Rimuovi tutti i tag HTML (inclusi quelli con attributi CSS)
     # Pattern per catturare tag con attributi: <tag attributi>contenuto</tag>
-    text = re.sub(r'<[^>]+>', ' ', text)
-    
-    # Rimuovi caratteri di controllo e spazi multipli
-    text = re.sub(r'\s+', ' ', text)
+    # Le descrizioni markdown spesso non ne hanno: regex solo se c'è un '<'
+    if '<' in text:
+        text = _HTML_TAG_RE.sub(' ', text)
     
-    # Rimuovi spazi all'inizio e alla fine
-    text = text.strip()
-    
-    return text
+    # Rimuovi caratteri di controllo e spazi multipli, e spazi all'inizio e alla fine:
+    # split()/join in C, stesso insieme di spazi Unicode di \s
+    return ' '.join(text.split())
 
 
-def align_columns(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+def align_columns(df: pd.DataFrame, columns: list[str] | tuple[str, ...]) -> pd.DataFrame:
     """Allinea un DataFrame alle colonne attese, aggiungendo colonne mancanti con None"""
+    columns = list(columns)
     if df is None or df.empty:
         return pd.DataFrame(columns=columns)
-    for col in columns:
-        if col not in df.columns:
-            df[col] = None
+    # Già allineato (stesse colonne nello stesso ordine): nessuna copia
+    if list(df.columns) == columns:
+        return df
+    # Colonne mancanti aggiunte in un unico blocco di None (niente assegnazioni colonna per colonna,
+    # che frammentano il DataFrame, e nessuna modifica al DataFrame del chiamante)
+    existing = set(df.columns)
+    missing = [col for col in columns if col not in existing]
+    if missing:
+        filler = pd.DataFrame(np.full((len(df), len(missing)), None, dtype=object), index=df.index, columns=missing)
+        df = pd.concat([df, filler], axis=1)
     # Conserva solo colonne attese nell'ordine
     return df[columns]
 
@@ -54,33 +96,6 @@ def get_expected_columns(existing_df: pd.DataFrame = None, fallback_df: pd.DataF
     Returns:
         tuple: (expected_columns, schema_upgrade_required)
     """
-    # Schema fisso definito a priori
-    FIXED_SCHEMA = [
-        # Identificatori
-        'id', 'site', 'job_url', 'job_url_direct', 'title', 'company',
-        
-        # Posizione e tempo
-        'location', 'date_posted', 'job_type', 'is_remote', 'work_from_home_type',
-        
-        # Compenso
-        'interval', 'min_amount', 'max_amount', 'currency',
-        
-        # Ruolo e competenze
-        'job_level', 'job_function', 'skills', 'description',
-        
-        # Azienda
-        'company_url', 'company_logo', 'company_num_employees', 'company_revenue', 
-        'company_description', 'company_industries', 'company_activities',
-        
-        # Campi aggiuntivi HiringCafe
-        'language_requirements', 'role_activities',
-        
-        # Colonne arricchimento LLM
-        'llm_score', 'llm_motivazione', 'llm_match_competenze',
-        
-        # Data di scraping
-        'scraping_date',
-    ]
     
     if existing_df is not None:
         # Se esiste un DataFrame, usa le sue colonne ma aggiungi quelle mancanti dello schema fisso
@@ -90,42 +105,98 @@ def get_expected_columns(existing_df: pd.DataFrame = None, fallback_df: pd.DataF
         schema_upgrade_required = len(missing_columns) > 0
     else:
         # Nessun DataFrame esistente: usa schema fisso
-        expected_columns = FIXED_SCHEMA.copy()
+        expected_columns = list(FIXED_SCHEMA)
         schema_upgrade_required = False
         
     return expected_columns, schema_upgrade_required
 
-def combine_sources(*dataframes: pd.DataFrame, expected_columns: list[str]) -> pd.DataFrame:
+def combine_sources(*dataframes: pd.DataFrame, expected_columns: list[str] | tuple[str, ...], seen_ids: set[str] | None = None) -> pd.DataFrame:
     """
     Combina multiple fonti di job scraping in un unico DataFrame.
     
+    La deduplicazione è incrementale: ogni fonte viene filtrata sugli id già visti
+    prima del concat, così il DataFrame combinato contiene solo righe uniche.
+    
     Args:
         *dataframes: Uno o più DataFrame da combinare
         expected_columns: Lista delle colonne attese nello schema finale
+        seen_ids: id già restituiti da chiamate precedenti (scartati e aggiornati in place),
+            per combinare fonti che arrivano in momenti diversi
         
     Returns:
         DataFrame combinato e deduplicato, o DataFrame vuoto se nessuna fonte ha dati
     """
-    frames = []
+    # Fonti vuote/assenti scartate prima dell'allineamento (niente DataFrame vuoti da costruire)
+    frames = [align_columns(df, expected_columns) for df in dataframes if df is not None and not df.empty]
     
-    for df in dataframes:
-        aligned_df = align_columns(df, expected_columns)
-        if not aligned_df.empty:
-            # Estrai il nome della fonte dalla colonna 'site' (usa il primo valore)
-            source_name = aligned_df['site'].iloc[0] if 'site' in aligned_df.columns else "Unknown"
-            frames.append(aligned_df)
-            print(f"{source_name}: {len(aligned_df)} job raccolti")
+    for aligned_df in frames:
+        # Estrai il nome della fonte dalla colonna 'site' (usa il primo valore)
+        source_name = aligned_df['site'].iloc[0] if 'site' in aligned_df.columns else "Unknown"
+        print(f"{source_name}: {len(aligned_df)} job raccolti")
     
     if not frames:
         print("⚠️  Nessun job raccolto dalle fonti configurate")
-        return pd.DataFrame(columns=expected_columns)
+        return pd.DataFrame(columns=list(expected_columns))
     
-    all_sources = pd.concat(frames, ignore_index=True)
+    # Deduplicazione (protezione race condition multithreading) fonte per fonte con un set di id:
+    # nessun DataFrame combinato con duplicati da ripulire dopo il concat
+    if seen_ids is None:
+        seen_ids = set()
+    parts = []
+    for aligned_df in frames:
+        # Righe senza id scartate prima della conversione: astype(str) le trasformerebbe in "nan"/"None"
+        # e la deduplicazione le fonderebbe in un'unica riga fittizia
+        has_id = aligned_df['id'].notna() & aligned_df['id'].astype(str).str.strip().ne('')
+        if not has_id.all():
+            print(f"⚠️  {int((~has_id).sum())} job senza id scartati")
+            aligned_df = aligned_df[has_id]
+        # id in formato testo una sola volta (chiave del DB): i passaggi successivi non lo riconvertono
+        ids = aligned_df['id'].astype(str)
+        keep = ~(ids.isin(seen_ids) | ids.duplicated(keep='first'))
+        seen_ids.update(ids[keep])
+        parts.append(aligned_df.assign(id=ids)[keep])
     
-    # Deduplicazione (protezione race condition multithreading)
-    all_sources = all_sources.drop_duplicates(subset=['id'], keep='first')
+    # Ogni fonte è già allineata e filtrata: un unico concat
+    all_sources = pd.concat(parts, ignore_index=True)
     
     print(f"Totale raccolti: {len(all_sources)} job unici")
     return all_sources
 
 
+def _normalized_text(series: pd.Series) -> pd.Series:
+    """Testo minuscolo con spazi normalizzati (NaN restano NaN)."""
+    return series.str.lower().str.replace(_WHITESPACE_RE, ' ', regex=True).str.strip()
+
+
+def drop_cross_site_duplicates(df: pd.DataFrame, seen_keys: set[str] | None = None) -> pd.DataFrame:
+    """
+    Rimuove la stessa offerta pubblicata su più siti (id diversi) prima dell'arricchimento LLM.
+    
+    La chiave è azienda | titolo | città (prima parte della location), normalizzati;
+    le righe senza azienda o titolo non vengono mai scartate.
+    
+    Args:
+        df: DataFrame già deduplicato per id
+        seen_keys: chiavi già viste in chiamate precedenti (scartate e aggiornate in place)
+        
+    Returns:
+        DataFrame senza duplicati cross-site
+    """
+    if df.empty:
+        return df
+    city = _normalized_text(df['location'].astype('string').str.split(',').str[0]).fillna('')
+    keys = (
+        _normalized_text(df['company'].astype('string'))
+        + '|' + _normalized_text(df['title'].astype('string'))
+        + '|' + city
+    )
+    if seen_keys is None:
+        seen_keys = set()
+    has_key = keys.notna()
+    duplicated = has_key & (keys.isin(seen_keys) | keys.duplicated(keep='first'))
+    seen_keys.update(keys[has_key])
+    if duplicated.any():
+        print(f"Duplicati cross-site rimossi: {int(duplicated.sum())}")
+        return df[~duplicated]
+    return df
+
@@ -10,15 +10,22 @@ from __future__ import annotations
 
 import os
 import math
+import asyncio
+import json
+import base64
 import sqlite3
 import logging
 import time
 from contextlib import contextmanager
+from functools import lru_cache
 from datetime import datetime
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
 
 import pandas as pd
 
+if TYPE_CHECKING:
+    import aiosqlite
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
@@ -41,6 +48,23 @@ KNOWN_BOOLEAN_COLUMNS = {
 }
 
 
+# Colonne su cui /jobs e la CLI possono ordinare (indicizzate anche per la paginazione keyset)
+ORDERABLE_COLUMNS = ("llm_score", "scraping_date", "date_posted", "company", "location", "title")
+
+
+# Colonne restituite dalle query di elenco (dashboard /jobs e CLI `list`): niente SELECT *
+LIST_COLUMNS = (
+    "id", "llm_score", "title", "company", "location", "date_posted", "scraping_date",
+    "job_url", "llm_motivazione", "viewed", "interested", "applied", "notes",
+)
+_LIST_SELECT = "SELECT " + ", ".join(f"`{c}`" for c in LIST_COLUMNS) + " FROM jobs"
+
+
+# TTL (secondi) della cache in-process dei COUNT per mode usata da /jobs
+COUNT_CACHE_TTL = 10.0
+_count_cache: Dict[str, Tuple[float, int]] = {}
+
+
 USER_FLAG_COLUMNS = [
     "viewed",
     "interested",
@@ -51,23 +75,51 @@ USER_FLAG_COLUMNS = [
     "notes",
 ]
 
+# Pragma applicati a ogni connessione (sync e async).
+# Nota: un eventuale cambio di page_size va fatto prima del passaggio a WAL.
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",     # Write-Ahead Logging: i lettori non bloccano gli scrittori
+    "synchronous=NORMAL",   # Bilanciamento sicurezza/velocità (sicuro con WAL)
+    "temp_store=MEMORY",    # Tabelle temporanee in RAM
+    "mmap_size=268435456",  # 256 MB di I/O memory-mapped per le letture
+    "cache_size=-65536",    # 64 MB di page cache per connessione
+    "busy_timeout=5000",    # Attende fino a 5s un lock di scrittura invece di fallire con SQLITE_BUSY
+)
+
+# Limite storico di SQLite sui parametri per statement (SQLITE_MAX_VARIABLE_NUMBER < 3.32)
+SQLITE_MAX_VARIABLES = 999
+
 # Path di default per il database SQLite (percorso relativo alla root del progetto)
 DEFAULT_DB = os.path.join(os.path.dirname(os.path.dirname(__file__)), "storage", "jobs.db")
 
 
+@lru_cache(maxsize=1)
 def get_db_path() -> str:
-    """Ottiene il percorso del database SQLite."""
+    """Ottiene il percorso del database SQLite (env LISTSCRAPER_DB letta una sola volta per processo)."""
     return os.getenv("LISTSCRAPER_DB", DEFAULT_DB)
 
 @contextmanager
-def get_connection(db_path: str):
-    """Gestisce il ciclo di vita della connessione SQLite in modo sicuro e ottimizzato"""
-    conn = sqlite3.connect(db_path)
+def get_connection(db_path: str | sqlite3.Connection, check_same_thread: bool = True):
+    """Gestisce il ciclo di vita della connessione SQLite in modo sicuro e ottimizzato.
+
+    Accetta anche una connessione già aperta (condivisa tra più funzioni): in quel caso
+    viene solo gestita la transazione (commit/rollback), senza riapplicare i PRAGMA né chiuderla.
+    """
+    if isinstance(db_path, sqlite3.Connection):
+        conn = db_path
+        try:
+            yield conn
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"SQLite error: {e}")
+            raise
+        return
+
+    conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
     try:
-        # Migliora performance su bulk insert
-        conn.execute("PRAGMA journal_mode=WAL;")   # Write-Ahead Logging: migliora concorrenza
-        conn.execute("PRAGMA synchronous=NORMAL;") # Bilanciamento sicurezza/velocità
-        conn.execute("PRAGMA temp_store=MEMORY;")  # Tabelle temporanee in RAM
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(f"PRAGMA {pragma};")
         yield conn      # Restituisce la connessione al chiamante
         conn.commit()   # Commit automatico se nessun errore
     except sqlite3.Error as e:
@@ -78,6 +130,46 @@ def get_connection(db_path: str):
         conn.close()    # Chiusura garantita della connessione
 
 
+class AsyncConnectionPool:
+    """Pool limitato di connessioni aiosqlite pre-aperte (pragma e row_factory già impostati).
+
+    Pensato per un processo/worker ASGI: le connessioni vengono create una volta all'avvio
+    e riusate dalle richieste tramite `acquire`/`release`.
+    """
+
+    def __init__(self, db_path: str, size: int = 4):
+        if size < 1:
+            raise ValueError("size deve essere >= 1")
+        self.db_path = db_path
+        self.size = size
+        self._queue: "asyncio.Queue[aiosqlite.Connection]" = asyncio.Queue(maxsize=size)
+        self._connections: List["aiosqlite.Connection"] = []
+
+    async def open(self) -> None:
+        import aiosqlite
+
+        for _ in range(self.size):
+            conn = await aiosqlite.connect(self.db_path)
+            conn.row_factory = aiosqlite.Row
+            for pragma in SQLITE_PRAGMAS:
+                await conn.execute(f"PRAGMA {pragma};")
+            self._connections.append(conn)
+            self._queue.put_nowait(conn)
+
+    async def acquire(self) -> "aiosqlite.Connection":
+        return await self._queue.get()
+
+    def release(self, conn: "aiosqlite.Connection") -> None:
+        self._queue.put_nowait(conn)
+
+    async def close(self) -> None:
+        for conn in self._connections:
+            # Aggiorna le statistiche del planner per le query eseguite da questa connessione
+            await conn.execute("PRAGMA optimize;")
+            await conn.close()
+        self._connections.clear()
+
+
 def _map_sql_type(column_name: str) -> str:
     if column_name in KNOWN_INTEGER_COLUMNS:
         return "INTEGER"
@@ -89,13 +181,14 @@ def _map_sql_type(column_name: str) -> str:
     return "TEXT"
 
 
-def initialize_db(db_path: str, columns: List[str]) -> None:
+def initialize_db(db_path: str | sqlite3.Connection, columns: List[str]) -> None:
     """Crea lo schema se non esiste con colonne dinamiche dal DataFrame + flag utente.
 
     - Chiave primaria: id (TEXT) se presente nelle colonne, altrimenti rowid implicito
     - Indici utili su colonne di ordinamento comuni
     """
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    if not isinstance(db_path, sqlite3.Connection):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
     with get_connection(db_path) as conn:
         cur = conn.cursor()
 
@@ -146,11 +239,20 @@ def initialize_db(db_path: str, columns: List[str]) -> None:
         # Indici utili
         if has_id:
             cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_id ON jobs(id)")
-        for idx_col in ["llm_score", "date_posted", "company", "location", "title", "scraping_date"]:
+        for idx_col in ORDERABLE_COLUMNS:
             if idx_col in columns or idx_col in KNOWN_INTEGER_COLUMNS:
                 cur.execute(
                     f"CREATE INDEX IF NOT EXISTS idx_jobs_{idx_col} ON jobs({idx_col})"
                 )
+                # Indice composito allineato all'ORDER BY di query_jobs (paginazione keyset)
+                if has_id and "scraping_date" in columns:
+                    keyset_cols = [idx_col, "scraping_date", "id"] if idx_col != "scraping_date" else ["scraping_date", "id"]
+                    cur.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_jobs_{idx_col}_keyset ON jobs({', '.join(keyset_cols)})"
+                    )
+        if has_id and "scraping_date" in columns:
+            for stmt in _mode_index_statements():
+                cur.execute(stmt)
 
 
 def _to_python_value(col: str, value: Any) -> Any:
@@ -175,16 +277,38 @@ def _to_python_value(col: str, value: Any) -> Any:
     return value
 
 
-def get_existing_job_ids(db_path: str, job_ids: List[str]) -> set[str]:
+def _dataframe_to_records(df: pd.DataFrame, columns: List[str]) -> List[tuple]:
+    """Converte un DataFrame in tuple pronte per executemany, per colonna invece che per riga.
+
+    NaN/NA diventano None con un'unica passata; solo le colonne con tipo noto
+    (booleane/intere/numeriche) passano da `_to_python_value`.
+    """
+    obj = df[columns].astype(object)
+    obj = obj.where(obj.notna(), None)
+    arrays = []
+    for col in columns:
+        if col in KNOWN_BOOLEAN_COLUMNS or col in KNOWN_INTEGER_COLUMNS or col in KNOWN_NUMERIC_COLUMNS:
+            arrays.append([_to_python_value(col, v) for v in obj[col].tolist()])
+        else:
+            arrays.append(obj[col].tolist())
+    return list(zip(*arrays))
+
+
+def get_existing_job_ids(db_path: str | sqlite3.Connection, job_ids: Iterable[str]) -> set[str]:
     """Identifica quali job ID sono già presenti nel database.
     
+    Gli ID candidati vengono caricati in una tabella temporanea e confrontati con `jobs`
+    tramite JOIN sull'indice: il risultato è limitato ai soli ID passati (non cresce col DB)
+    e non c'è limite al numero di ID (niente IN con migliaia di placeholder).
+    
     Args:
-        db_path: Percorso al database SQLite
-        job_ids: Lista di ID da verificare
+        db_path: Percorso al database SQLite (o connessione già aperta)
+        job_ids: ID da verificare
         
     Returns:
         Set di ID già presenti nel database
     """
+    job_ids = [(str(job_id),) for job_id in job_ids]
     if not job_ids:
         return set()
     
@@ -202,9 +326,11 @@ def get_existing_job_ids(db_path: str, job_ids: List[str]) -> set[str]:
             if "id" not in columns:
                 return set()
             
-            # Query per trovare gli ID esistenti
-            placeholders = ",".join(["?"] * len(job_ids))
-            cur.execute(f"SELECT id FROM jobs WHERE id IN ({placeholders})", job_ids)
+            # Tabella temporanea (per connessione, in RAM con temp_store=MEMORY) con gli ID candidati
+            cur.execute("CREATE TEMP TABLE IF NOT EXISTS candidate_ids (id TEXT PRIMARY KEY)")
+            cur.execute("DELETE FROM candidate_ids")
+            cur.executemany("INSERT OR IGNORE INTO candidate_ids (id) VALUES (?)", job_ids)
+            cur.execute("SELECT c.id FROM candidate_ids c JOIN jobs j ON j.id = c.id")
             existing_ids = {str(row[0]) for row in cur.fetchall()}
             return existing_ids
     except sqlite3.Error as e:
@@ -212,14 +338,29 @@ def get_existing_job_ids(db_path: str, job_ids: List[str]) -> set[str]:
         return set()
 
 
-def upsert_jobs(db_path: str, jobs_dataframe: pd.DataFrame, batch_size: int = 2000) -> Tuple[int, int]:
+def _execute_multirow(cur: sqlite3.Cursor, sql: str, multi_sql: str, rows_per_stmt: int, rows: List[tuple]) -> None:
+    """Esegue `rows` a gruppi di `rows_per_stmt` righe per statement; il resto con lo statement a riga singola."""
+    full = len(rows) - len(rows) % rows_per_stmt if rows_per_stmt > 1 else 0
+    if full:
+        cur.executemany(
+            multi_sql,
+            (
+                tuple(v for row in rows[i:i + rows_per_stmt] for v in row)
+                for i in range(0, full, rows_per_stmt)
+            ),
+        )
+    if full < len(rows):
+        cur.executemany(sql, rows[full:])
+
+
+def upsert_jobs(db_path: str | sqlite3.Connection, jobs_dataframe: pd.DataFrame, batch_size: int = 2000) -> Tuple[int, int]:
     """Upsert diretto di un DataFrame in SQLite con chunking per performance.
 
     Preserva i flag utente esistenti (viewed/interested/applied/notes) durante gli update.
     Aggiunge automaticamente scraping_date se mancante.
 
     Args:
-        db_path: Percorso al database SQLite
+        db_path: Percorso al database SQLite (o connessione già aperta)
         jobs_dataframe: DataFrame pandas con i job da inserire/aggiornare
         batch_size: Dimensione dei chunk per il processing (default: 2000)
 
@@ -254,24 +395,26 @@ def upsert_jobs(db_path: str, jobs_dataframe: pd.DataFrame, batch_size: int = 20
         try:
             with get_connection(db_path) as conn:
                 cur = conn.cursor()
+                # Un'unica transazione di scrittura per tutti i chunk (commit finale in get_connection);
+                # IMMEDIATE prende subito il lock di scrittura, senza upgrade a metà (SQLITE_BUSY)
+                cur.execute("BEGIN IMMEDIATE")
 
                 # Setup statements
                 placeholders = ",".join(["?"] * len(df_columns))
+                insert_head = "INSERT INTO jobs (" + ",".join([f"`{c}`" for c in df_columns]) + ") VALUES "
 
                 if has_id:
                     # On conflict su id aggiorna tutte le colonne del DataFrame ma non toccare i flag utente
                     update_assignments = ",".join([f"`{c}`=excluded.`{c}`" for c in df_columns if c != "id"])
-                    sql = (
-                        f"INSERT INTO jobs (" + ",".join([f"`{c}`" for c in df_columns]) + ") "
-                        f"VALUES ({placeholders}) "
-                        f"ON CONFLICT(id) DO UPDATE SET {update_assignments}"
-                    )
+                    conflict_clause = f" ON CONFLICT(id) DO UPDATE SET {update_assignments}"
                 else:
                     # Nessun id: inserimenti semplici
-                    sql = (
-                        f"INSERT INTO jobs (" + ",".join([f"`{c}`" for c in df_columns]) + ") "
-                        f"VALUES ({placeholders})"
-                    )
+                    conflict_clause = ""
+
+                # Più righe per statement (VALUES (...),(...),...) entro il limite di 999 variabili di SQLite
+                rows_per_stmt = max(1, SQLITE_MAX_VARIABLES // len(df_columns))
+                sql = insert_head + f"({placeholders})" + conflict_clause
+                multi_sql = insert_head + ",".join([f"({placeholders})"] * rows_per_stmt) + conflict_clause
 
                 # Processa in chunk per evitare memory overflow
                 total_rows = len(jobs_dataframe)
@@ -281,13 +424,7 @@ def upsert_jobs(db_path: str, jobs_dataframe: pd.DataFrame, batch_size: int = 20
                 for chunk_idx in range(num_chunks):
                     start_idx = chunk_idx * batch_size
                     end_idx = min((chunk_idx + 1) * batch_size, total_rows)
-                    chunk = jobs_dataframe.iloc[start_idx:end_idx].copy()
-
-                    chunk = chunk.where(pd.notna(chunk), None)
-                    rows = []
-                    for _, row in chunk.iterrows():
-                        values = [_to_python_value(col, row.get(col)) for col in df_columns]
-                        rows.append(tuple(values))
+                    rows = _dataframe_to_records(jobs_dataframe.iloc[start_idx:end_idx], df_columns)
 
                     if not rows:
                         continue
@@ -298,11 +435,11 @@ def upsert_jobs(db_path: str, jobs_dataframe: pd.DataFrame, batch_size: int = 20
                         q_marks = ",".join(["?"] * len(ids))
                         cur.execute(f"SELECT COUNT(1) FROM jobs WHERE id IN ({q_marks})", ids)
                         existing_count = cur.fetchone()[0]
-                        cur.executemany(sql, rows)
+                        _execute_multirow(cur, sql, multi_sql, rows_per_stmt, rows)
                         inserted += len(rows) - existing_count
                         updated += existing_count
                     else:
-                        cur.executemany(sql, rows)
+                        _execute_multirow(cur, sql, multi_sql, rows_per_stmt, rows)
                         inserted += len(rows)
 
                     logger.info(f"Chunk {chunk_idx + 1}/{num_chunks} processato: {len(rows)} righe")
@@ -323,6 +460,150 @@ def upsert_jobs(db_path: str, jobs_dataframe: pd.DataFrame, batch_size: int = 20
     return inserted, updated
 
 
+# WHERE per filtro di stato (mode), precalcolate: un lookup per query invece di una catena di if
+_MODE_WHERE: Dict[str, str] = {
+    "not_viewed": "WHERE (viewed IS NULL OR viewed = 0) AND (interested IS NULL OR interested = 0) AND (applied IS NULL OR applied = 0)",
+    "viewed": "WHERE viewed = 1 AND (interested IS NULL OR interested = 0) AND (applied IS NULL OR applied = 0)",
+    "interested": "WHERE interested = 1 AND (applied IS NULL OR applied = 0)",
+    "applied": "WHERE applied = 1",
+}
+
+
+def _mode_where_clause(mode: str) -> str:
+    """WHERE clause per il filtro di stato (mode); mode sconosciuto/vuoto = nessun filtro."""
+    return _MODE_WHERE.get(mode, "")
+
+
+def _mode_index_statements() -> List[str]:
+    """Indici parziali per mode, allineati all'ordinamento di default di /jobs.
+
+    La WHERE dell'indice è identica a quella di `_MODE_WHERE`, così il planner la riconosce
+    e la pagina 1 di ogni vista diventa una scansione di indice già ordinata.
+    """
+    return [
+        f"CREATE INDEX IF NOT EXISTS idx_jobs_{mode} "
+        f"ON jobs(llm_score DESC, scraping_date DESC, id DESC) {where}"
+        for mode, where in _MODE_WHERE.items()
+    ]
+
+
+async def ensure_mode_indexes_async(db: "aiosqlite.Connection") -> None:
+    """Crea gli indici parziali per mode su un DB esistente (no-op se la tabella jobs non c'è ancora)."""
+    async with db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'jobs'") as cur:
+        if await cur.fetchone() is None:
+            return
+    for stmt in _mode_index_statements():
+        await db.execute(stmt)
+    await db.commit()
+
+
+def encode_cursor(row: Dict[str, Any], order_by: str) -> str:
+    """Codifica la posizione dell'ultima riga di una pagina come cursore opaco (base64 JSON)."""
+    order_col = order_by.replace("`", "")
+    payload = [row.get(order_col), row.get("scraping_date"), row.get("id")]
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any, Any]:
+    """Decodifica un cursore prodotto da `encode_cursor` in (order_val, scraping_date, id)."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("cursor non valido")
+    if not isinstance(payload, list) or len(payload) != 3 or payload[2] is None:
+        raise ValueError("cursor non valido")
+    return payload[0], payload[1], payload[2]
+
+
+def _keyset_clause(order_col: str, order_dir: str, cursor: str) -> Tuple[str, List[Any]]:
+    """Condizione "righe successive al cursore" per l'ordinamento di query_jobs.
+
+    Le chiavi di ordinamento sono (order_col order_dir, scraping_date DESC, id order_dir),
+    tutte con NULL in coda: il confronto va espanso a mano perché direzioni e NULL
+    non permettono un semplice confronto tra row value.
+    """
+    keys = [
+        (order_col, order_dir),
+        ("scraping_date", "DESC"),
+        ("id", order_dir),
+    ]
+    values = decode_cursor(cursor)
+
+    branches: List[str] = []
+    params: List[Any] = []
+    for i, ((col, direction), value) in enumerate(zip(keys, values)):
+        if value is None:
+            # Con NULLS LAST nessun valore segue un NULL: solo le chiavi successive discriminano
+            continue
+        terms: List[str] = []
+        branch_params: List[Any] = []
+        for (prev_col, _), prev_value in zip(keys[:i], values[:i]):
+            if prev_value is None:
+                terms.append(f"`{prev_col}` IS NULL")
+            else:
+                terms.append(f"`{prev_col}` = ?")
+                branch_params.append(prev_value)
+        op = "<" if direction == "DESC" else ">"
+        terms.append(f"(`{col}` {op} ? OR `{col}` IS NULL)")
+        branch_params.append(value)
+        branches.append("(" + " AND ".join(terms) + ")")
+        params.extend(branch_params)
+
+    if not branches:
+        return "0", []
+    return "(" + " OR ".join(branches) + ")", params
+
+
+def _build_jobs_query(
+    page: int,
+    page_size: int,
+    order_by: str,
+    order_dir: str,
+    mode: str,
+    cursor: Optional[str] = None,
+) -> Tuple[str, str, Tuple[Any, ...]]:
+    """Ritorna (sql_count, sql_select, params_select) condivisi tra versione sync e async.
+
+    Con `cursor` la pagina parte dopo l'ultima riga della pagina precedente (keyset),
+    senza OFFSET; altrimenti usa LIMIT/OFFSET calcolato da `page`.
+    """
+    assert page >= 1
+    assert page_size >= 1
+    order_dir = order_dir.upper()
+    if order_dir not in ("ASC", "DESC"):
+        order_dir = "DESC"
+
+    # Costruisci WHERE clause basata su mode
+    where_clause = _mode_where_clause(mode)
+
+    # Protezione basilare su nome colonna: usa backticks
+    order_col = order_by.replace("`", "")
+
+    # Aggiungi sempre scraping_date DESC come ordinamento secondario
+    order_clause = f"ORDER BY `{order_col}` {order_dir} NULLS LAST, `scraping_date` DESC, id {order_dir}"
+
+    sql_count = f"SELECT COUNT(1) FROM jobs {where_clause}"
+
+    if cursor:
+        keyset_sql, keyset_params = _keyset_clause(order_col, order_dir, cursor)
+        keyset_where = f"{where_clause} AND {keyset_sql}" if where_clause else f"WHERE {keyset_sql}"
+        sql_select = (
+            f"{_LIST_SELECT} {keyset_where} "
+            f"{order_clause} "
+            f"LIMIT ?"
+        )
+        return sql_count, sql_select, (*keyset_params, page_size)
+
+    sql_select = (
+        f"{_LIST_SELECT} {where_clause} "
+        f"{order_clause} "
+        f"LIMIT ? OFFSET ?"
+    )
+    offset = (page - 1) * page_size
+    return sql_count, sql_select, (page_size, offset)
+
+
 def query_jobs(
     db_path: str,
     page: int = 1,
@@ -330,6 +611,7 @@ def query_jobs(
     order_by: str = "llm_score",
     order_dir: str = "DESC",
     mode: str = "not_viewed",
+    cursor: Optional[str] = None,
 ) -> Tuple[List[Dict[str, Any]], int, int]:
     """Ritorna righe paginate e ordinate.
 
@@ -339,105 +621,252 @@ def query_jobs(
             - "viewed": viewed=1 AND interested=0/NULL AND applied=0/NULL
             - "interested": interested=1 AND applied=0/NULL
             - "applied": applied=1
+        cursor: cursore keyset (vedi `encode_cursor`); se presente ignora l'OFFSET di `page`
 
     Returns:
         (rows, total_rows, total_pages)
     """
-    assert page >= 1
-    assert page_size >= 1
-    order_dir = order_dir.upper()
-    if order_dir not in ("ASC", "DESC"):
-        order_dir = "DESC"
+    sql_count, sql_select, params = _build_jobs_query(page, page_size, order_by, order_dir, mode, cursor)
 
     with get_connection(db_path) as conn:
         conn.row_factory = sqlite3.Row
         cur = conn.cursor()
 
-        # Costruisci WHERE clause basata su mode
-        where_clause = ""
-        if mode == "not_viewed":
-            where_clause = "WHERE (viewed IS NULL OR viewed = 0) AND (interested IS NULL OR interested = 0) AND (applied IS NULL OR applied = 0)"
-        elif mode == "viewed":
-            where_clause = "WHERE viewed = 1 AND (interested IS NULL OR interested = 0) AND (applied IS NULL OR applied = 0)"
-        elif mode == "interested":
-            where_clause = "WHERE interested = 1 AND (applied IS NULL OR applied = 0)"
-        elif mode == "applied":
-            where_clause = "WHERE applied = 1"
-
         # Conteggio totale
-        cur.execute(f"SELECT COUNT(1) FROM jobs {where_clause}")
+        cur.execute(sql_count)
         total_rows = int(cur.fetchone()[0])
         total_pages = max(1, math.ceil(total_rows / page_size))
-        offset = (page - 1) * page_size
 
-        # Protezione basilare su nome colonna: usa backticks
-        order_col = order_by.replace("`", "")
+        cur.execute(sql_select, params)
+        rows = [dict(r) for r in cur.fetchall()]
 
-        # Aggiungi sempre scraping_date DESC come ordinamento secondario
-        order_clause = f"ORDER BY `{order_col}` {order_dir} NULLS LAST, `scraping_date` DESC, id {order_dir}"
+    return rows, total_rows, total_pages
 
-        sql = (
-            f"SELECT * FROM jobs {where_clause} "
-            f"{order_clause} "
-            f"LIMIT ? OFFSET ?"
-        )
-        cur.execute(sql, (page_size, offset))
-        rows = [dict(r) for r in cur.fetchall()]
+
+async def query_jobs_async(
+    db: "aiosqlite.Connection",
+    page: int = 1,
+    page_size: int = 50,
+    order_by: str = "llm_score",
+    order_dir: str = "DESC",
+    mode: str = "not_viewed",
+    cursor: Optional[str] = None,
+    total_rows: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], int, int]:
+    """Variante async di `query_jobs` su una connessione aiosqlite già aperta (condivisa).
+
+    Args:
+        total_rows: conteggio già noto (es. da `count_jobs_async`); se passato il COUNT viene saltato
+
+    Returns:
+        (rows, total_rows, total_pages)
+    """
+    sql_count, sql_select, params = _build_jobs_query(page, page_size, order_by, order_dir, mode, cursor)
+
+    if total_rows is None:
+        async with db.execute(sql_count) as cur:
+            total_rows = int((await cur.fetchone())[0])
+    total_pages = max(1, math.ceil(total_rows / page_size))
+
+    async with db.execute(sql_select, params) as cur:
+        rows = [dict(r) for r in await cur.fetchall()]
 
     return rows, total_rows, total_pages
 
 
-def set_job_flags(
-    db_path: str,
+async def iter_jobs_async(
+    db: "aiosqlite.Connection",
+    page: int = 1,
+    page_size: int = 50,
+    order_by: str = "llm_score",
+    order_dir: str = "DESC",
+    mode: str = "not_viewed",
+    cursor: Optional[str] = None,
+    batch_size: int = 64,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Come `query_jobs_async`, ma restituisce la pagina a blocchi di `batch_size` righe (senza COUNT).
+
+    Ogni blocco costa un solo passaggio nel thread di aiosqlite e la pagina non viene mai
+    materializzata per intero.
+    """
+    _, sql_select, params = _build_jobs_query(page, page_size, order_by, order_dir, mode, cursor)
+
+    async with db.execute(sql_select, params) as cur:
+        while True:
+            batch = await cur.fetchmany(batch_size)
+            if not batch:
+                break
+            yield [dict(r) for r in batch]
+
+
+async def count_jobs_async(db: "aiosqlite.Connection", mode: str = "not_viewed", refresh: bool = False) -> int:
+    """COUNT delle righe per `mode`, memoizzato per COUNT_CACHE_TTL secondi.
+
+    Il processo API serve un solo DB, quindi la chiave è il solo `mode`; la cache viene
+    svuotata a ogni aggiornamento dei flag. Con `refresh=True` (es. pagina 1) il COUNT
+    viene sempre ricalcolato e la cache aggiornata.
+    """
+    now = time.monotonic()
+    cached = _count_cache.get(mode)
+    if not refresh and cached is not None and now - cached[0] < COUNT_CACHE_TTL:
+        return cached[1]
+
+    async with db.execute(f"SELECT COUNT(1) FROM jobs {_mode_where_clause(mode)}") as cur:
+        total_rows = int((await cur.fetchone())[0])
+    _count_cache[mode] = (now, total_rows)
+    return total_rows
+
+
+def invalidate_count_cache() -> None:
+    """Svuota la cache dei COUNT (i flag determinano in quale mode cade ogni riga)."""
+    _count_cache.clear()
+
+
+# Template degli UPDATE dei flag indicizzati per bitmask dei campi presenti (max 16 varianti):
+# testo SQL identico per la stessa forma => riuso dello statement cache di sqlite3
+_FLAG_UPDATE_TEMPLATES: Dict[int, str] = {}
+_FLAG_VIEWED, _FLAG_INTERESTED, _FLAG_APPLIED, _FLAG_NOTE = 1, 2, 4, 8
+
+
+def _flags_update_template(mask: int) -> str:
+    sql = _FLAG_UPDATE_TEMPLATES.get(mask)
+    if sql is None:
+        assignments: List[str] = []
+        if mask & _FLAG_VIEWED:
+            assignments += ["viewed=?", "viewed_at=?"]
+        if mask & _FLAG_INTERESTED:
+            assignments += ["interested=?", "interested_at=?"]
+        if mask & _FLAG_APPLIED:
+            assignments += ["applied=?", "applied_at=?"]
+        if mask & _FLAG_NOTE:
+            assignments.append("notes=?")
+        sql = f"UPDATE jobs SET {', '.join(assignments)} WHERE id=?"
+        _FLAG_UPDATE_TEMPLATES[mask] = sql
+    return sql
+
+
+def _build_flags_update(
     job_id: str,
     viewed: Optional[bool] = None,
     interested: Optional[bool] = None,
     applied: Optional[bool] = None,
     note: Optional[str] = None,
-) -> None:
-    """Aggiorna i flag utente per una riga identificata da `id`."""
+) -> Optional[Tuple[str, List[Any]]]:
+    """Costruisce (sql, params) per l'UPDATE dei flag utente; None se non c'è nulla da aggiornare."""
     if job_id is None:
         raise ValueError("job_id richiesto per aggiornare i flag")
 
-    updates: List[str] = []
+    mask = 0
     params: List[Any] = []
 
     now_iso = datetime.utcnow().isoformat(timespec="seconds")
 
     if viewed is not None:
-        updates.append("viewed=?")
-        params.append(1 if viewed else 0)
-        updates.append("viewed_at=?")
-        params.append(now_iso if viewed else None)
+        mask |= _FLAG_VIEWED
+        params += [1 if viewed else 0, now_iso if viewed else None]
 
     if interested is not None:
-        updates.append("interested=?")
-        params.append(1 if interested else 0)
-        updates.append("interested_at=?")
-        params.append(now_iso if interested else None)
+        mask |= _FLAG_INTERESTED
+        params += [1 if interested else 0, now_iso if interested else None]
 
     if applied is not None:
-        updates.append("applied=?")
-        params.append(1 if applied else 0)
-        updates.append("applied_at=?")
-        params.append(now_iso if applied else None)
+        mask |= _FLAG_APPLIED
+        params += [1 if applied else 0, now_iso if applied else None]
 
     if note is not None:
-        updates.append("notes=?")
+        mask |= _FLAG_NOTE
         params.append(note)
 
-    if not updates:
-        # Non sollevare errore, semplicemente ritorna
-        return
+    if not mask:
+        return None
 
     params.append(job_id)
-    sql = f"UPDATE jobs SET {', '.join(updates)} WHERE id=?"
+    return _flags_update_template(mask), params
+
+
+def set_job_flags(
+    db_path: str,
+    job_id: str,
+    viewed: Optional[bool] = None,
+    interested: Optional[bool] = None,
+    applied: Optional[bool] = None,
+    note: Optional[str] = None,
+) -> None:
+    """Aggiorna i flag utente per una riga identificata da `id`."""
+    update = _build_flags_update(job_id, viewed, interested, applied, note)
+    if update is None:
+        # Non sollevare errore, semplicemente ritorna
+        return
+    sql, params = update
 
     with get_connection(db_path) as conn:
         cur = conn.cursor()
         result = cur.execute(sql, params)
         if result.rowcount == 0:
             raise ValueError(f"Job con id '{job_id}' non trovato")
+    invalidate_count_cache()
+
+
+async def set_job_flags_async(
+    db: "aiosqlite.Connection",
+    job_id: str,
+    viewed: Optional[bool] = None,
+    interested: Optional[bool] = None,
+    applied: Optional[bool] = None,
+    note: Optional[str] = None,
+) -> None:
+    """Variante async di `set_job_flags` su una connessione aiosqlite già aperta (condivisa)."""
+    update = _build_flags_update(job_id, viewed, interested, applied, note)
+    if update is None:
+        return
+    sql, params = update
+
+    async with db.execute(sql, params) as cur:
+        rowcount = cur.rowcount
+    if rowcount == 0:
+        await db.rollback()
+        raise ValueError(f"Job con id '{job_id}' non trovato")
+    await db.commit()
+    invalidate_count_cache()
+
+async def set_job_flags_bulk_async(db: "aiosqlite.Connection", updates: List[Dict[str, Any]]) -> int:
+    """Applica più aggiornamenti di flag in un'unica transazione.
+
+    Ogni elemento di `updates` ha `job_id` e, opzionali, viewed/interested/applied/note.
+    Gli UPDATE con la stessa forma vengono raggruppati ed eseguiti con `executemany`.
+
+    Returns:
+        Numero di righe aggiornate (gli id inesistenti vengono ignorati)
+    """
+    grouped: Dict[str, List[List[Any]]] = {}
+    for upd in updates:
+        built = _build_flags_update(
+            upd.get("job_id"),
+            viewed=upd.get("viewed"),
+            interested=upd.get("interested"),
+            applied=upd.get("applied"),
+            note=upd.get("note"),
+        )
+        if built is None:
+            continue
+        sql, params = built
+        grouped.setdefault(sql, []).append(params)
+
+    if not grouped:
+        return 0
+
+    updated = 0
+    try:
+        await db.execute("BEGIN IMMEDIATE")
+        for sql, rows in grouped.items():
+            async with db.executemany(sql, rows) as cur:
+                updated += max(0, cur.rowcount)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    invalidate_count_cache()
+    return updated
 
 def get_jobs_with_null_scores(db_path: str, batch_size: int = 100) -> pd.DataFrame:
     """
@@ -462,7 +891,7 @@ def get_jobs_with_null_scores(db_path: str, batch_size: int = 100) -> pd.DataFra
     
     return df
 
-def get_jobs_to_enrich(jobs_df: pd.DataFrame, db_path: str = None) -> pd.DataFrame:
+def get_jobs_to_enrich(jobs_df: pd.DataFrame, db_path: str | sqlite3.Connection = None) -> pd.DataFrame:
     """
     Identifica i job che necessitano arricchimento LLM, dati dalla combinazione di:
     - Job nuovi (non presenti nel DB)
@@ -470,7 +899,7 @@ def get_jobs_to_enrich(jobs_df: pd.DataFrame, db_path: str = None) -> pd.DataFra
     
     Args:
         jobs_df: DataFrame con job appena scrapati
-        db_path: Percorso del database (opzionale, usa default se None)
+        db_path: Percorso del database o connessione già aperta (opzionale, usa default se None)
         
     Returns:
         DataFrame con job da processare con LLM 
@@ -484,11 +913,11 @@ def get_jobs_to_enrich(jobs_df: pd.DataFrame, db_path: str = None) -> pd.DataFra
     if db_path is None:
         db_path = get_db_path()
     
-    # Step 1: Identifica job nuovi vs esistenti
-    job_ids = jobs_df['id'].astype(str).tolist()
-    existing_job_ids = get_existing_job_ids(db_path, job_ids)
+    # Step 1: Identifica job nuovi vs esistenti (id convertito a testo una sola volta)
+    id_str = jobs_df['id'].astype(str)
+    existing_job_ids = get_existing_job_ids(db_path, id_str.tolist())
     
-    new_jobs_mask = ~jobs_df['id'].astype(str).isin(existing_job_ids)
+    new_jobs_mask = ~id_str.isin(existing_job_ids)
     new_jobs_df = jobs_df[new_jobs_mask].copy()
     
     print(f"\n=== IDENTIFICAZIONE JOB NUOVI VS ESISTENTI ===")
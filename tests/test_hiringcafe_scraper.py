@@ -0,0 +1,20 @@
+import unittest
+
+from scrapers.hiringcafe_scraper import normalize_hiring_cafe_jobs_to_schema
+from scrapers.utils import FIXED_SCHEMA
+
+
+class NormalizeHiringCafeIdsTest(unittest.TestCase):
+    def test_mixed_id_and_object_id_keep_integer_format(self):
+        jobs = [{"id": 5}, {"objectID": 7}, {"id": "abc"}]
+        df = normalize_hiring_cafe_jobs_to_schema(jobs, list(FIXED_SCHEMA))
+        self.assertEqual(df["id"].tolist(), ["hc-5", "hc-7", "hc-abc"])
+
+    def test_missing_id_stays_empty(self):
+        df = normalize_hiring_cafe_jobs_to_schema([{"id": 5}, {}], list(FIXED_SCHEMA))
+        self.assertEqual(df["id"].iloc[0], "hc-5")
+        self.assertTrue(df["id"].isna().iloc[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
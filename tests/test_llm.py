@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+try:
+    from scrapers import llm
+    from scrapers.llm_cache import LLMResultCache
+except ImportError:  # google-genai non installato
+    llm = None
+
+
+MODEL_REPLY = {
+    "score_competenze": 7,
+    "score_azienda": 6,
+    "score_stipendio": 5,
+    "score_località": 8,
+    "score_crescita": 6,
+    "motivazione": "ok",
+    "match_competenze": ["python"],
+}
+
+
+def _job(**overrides):
+    job = {
+        "title": "Data Engineer",
+        "company": "Acme",
+        "location": "Milano, Lombardia",
+        "description": "Sviluppo pipeline in Python e Spark.",
+    }
+    job.update(overrides)
+    return job
+
+
+@unittest.skipIf(llm is None, "google-genai non installato")
+class LLMTestCase(unittest.TestCase):
+    """Valutazioni con cache su database temporaneo e chiamata al modello simulata."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = LLMResultCache(db_path=os.path.join(tmp.name, "cache.db"))
+        self.addCleanup(cache.close)
+        llm.initialize_api_keys(["test-key"])
+        self.model_calls = []
+        patches = (
+            mock.patch.object(llm, "get_llm_cache", return_value=cache),
+            mock.patch.object(llm, "_generate_json_text", side_effect=self._reply),
+        )
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _reply(self, api_key, model_name, prompt, config):
+        self.model_calls.append(prompt)
+        if "Numero di offerte:" in prompt:
+            ids = [line.split("id=")[1].split(" ")[0] for line in prompt.splitlines() if line.startswith("=== OFFERTA id=")]
+            return json.dumps([{"id": i, **MODEL_REPLY} for i in ids])
+        return json.dumps(MODEL_REPLY)
+
+
+class NearDuplicateCacheTest(LLMTestCase):
+    def test_formatting_change_reuses_evaluation(self):
+        llm.evaluate_job(_job())
+        llm.evaluate_job(_job(title="DATA  ENGINEER", description="Sviluppo pipeline in python e Spark"))
+        self.assertEqual(len(self.model_calls), 1)
+
+    def test_changed_location_misses_near_duplicate_tier(self):
+        llm.evaluate_job(_job())
+        llm.evaluate_job(_job(location="Napoli, Campania"))
+        self.assertEqual(len(self.model_calls), 2)
+
+    def test_changed_compensation_misses_near_duplicate_tier(self):
+        llm.evaluate_job(_job(min_amount=30000.0))
+        llm.evaluate_job(_job(min_amount=30000))
+        llm.evaluate_job(_job(min_amount=45000))
+        self.assertEqual(len(self.model_calls), 2)
+
+
+class EnrichDeduplicationTest(LLMTestCase):
+    def _enrich(self, jobs):
+        df = pd.DataFrame([{"id": str(i), **job} for i, job in enumerate(jobs)])
+        return llm.enrich_dataframe_with_llm(df, batch_size=1)
+
+    def test_identical_postings_evaluated_once(self):
+        enriched = self._enrich([_job(), _job()])
+        self.assertEqual(len(self.model_calls), 1)
+        self.assertEqual(enriched["llm_score"].tolist()[0], enriched["llm_score"].tolist()[1])
+
+    def test_same_posting_in_two_locations_evaluated_twice(self):
+        self._enrich([_job(), _job(location="Napoli, Campania")])
+        self.assertEqual(len(self.model_calls), 2)
+        self.assertTrue(any("Napoli" in prompt for prompt in self.model_calls))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+
+import pandas as pd
+
+from scrapers.utils import combine_sources
+
+
+class CombineSourcesIdsTest(unittest.TestCase):
+    COLUMNS = ["id", "site", "title"]
+
+    def test_missing_ids_are_dropped_not_merged(self):
+        first = pd.DataFrame({"id": ["a", None, float("nan"), ""], "site": "indeed", "title": ["A", "B", "C", "D"]})
+        second = pd.DataFrame({"id": [None, "b", "a"], "site": "linkedin", "title": ["E", "F", "G"]})
+        combined = combine_sources(first, second, expected_columns=self.COLUMNS)
+        self.assertEqual(combined["id"].tolist(), ["a", "b"])
+        self.assertEqual(combined["title"].tolist(), ["A", "F"])
+
+    def test_seen_ids_skip_previous_batches(self):
+        seen_ids = {"1"}
+        df = pd.DataFrame({"id": [1, 2, 2], "site": "indeed", "title": ["A", "B", "C"]})
+        combined = combine_sources(df, expected_columns=self.COLUMNS, seen_ids=seen_ids)
+        self.assertEqual(combined["id"].tolist(), ["2"])
+        self.assertEqual(seen_ids, {"1", "2"})
+
+
+if __name__ == "__main__":
+    unittest.main()